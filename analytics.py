@@ -0,0 +1,192 @@
+"""Analitik penjualan & funnel kanggo dashboard admin.
+
+- SalesAnalytics  : agregat inkremental (omzet per dina, produk terlaris) sing
+                    mung maca order anyar (id > last_id), disimpen nang file state
+                    dadi ora scan history maneh sakwise restart.
+- read_funnel     : rekap funnel bot (ditulis FunnelRecorder nang funnel.py).
+"""
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+import pandas as pd
+from funnel import ANALYTICS_DB_PATH, FUNNEL_EVENTS, connect_funnel_db
+
+# ==========================================
+# ⚙️ KONFIGURASI ANALITIK
+# ==========================================
+ANALYTICS_TZ = os.getenv("ANALYTICS_TZ", "Asia/Jakarta")
+ANALYTICS_STATE_PATH = os.getenv("ANALYTICS_STATE_PATH", "analytics_state.json")
+ANALYTICS_FETCH_BATCH = int(os.getenv("ANALYTICS_FETCH_BATCH", "1000"))
+# Paling cepet semene detik sekali takon order anyar menyang Supabase
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60"))
+
+# detail_items = "<items> (<detail>)"; items bisa isi pirang-pirang produk
+ITEM_SPLIT = r"\s*(?:,|;|\+|&|\n|\bdan\b)\s*"
+QTY_PATTERN = r"\b\d+(?:[.,]\d+)?\s*(?:x|pcs|lembar|lbr|box|meter|m|rim|buah|eks|set)?\b|\bx\b"
+
+
+def _daily_series(values, dtype):
+    """Series per dina kanthi DatetimeIndex (uga nek kosong, ben filter/resample ora gagal)."""
+    return pd.Series(list(values.values()), index=pd.to_datetime(list(values.keys())), dtype=dtype)
+
+
+class SalesAnalytics:
+    """Agregat order sing dijaga inkremental miturut id order pungkasan sing wis diwaca.
+
+    loader(after_id, limit) -> list dict (id, created_at, total_biaya, detail_items), urut id munggah.
+    Omzet diitung saka order sing mlebu (status Batal ora dikurangi, amarga
+    owah-owahan status ora ngowahi id).
+    """
+
+    def __init__(self, loader, catalog=(), state_path=ANALYTICS_STATE_PATH,
+                 batch_size=ANALYTICS_FETCH_BATCH, refresh_interval=ANALYTICS_REFRESH_INTERVAL):
+        self.loader = loader
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self.last_id = 0
+        self.daily_revenue = _daily_series({}, "float64")
+        self.daily_orders = _daily_series({}, "int64")
+        self.product_counts = pd.Series(dtype="int64")
+        self._catalog = {}
+        self._lock = threading.Lock()
+        self._next_refresh = 0.0
+        self.set_catalog(catalog)
+        self._load_state()
+
+    def set_catalog(self, names):
+        """Jeneng produk katalog; item order dicocokake menyang jeneng iki dhisik."""
+        self._catalog = {str(n).lower(): str(n) for n in names if n}
+
+    # -- State --
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.last_id = int(state.get("last_id", 0))
+            self.daily_revenue = _daily_series(state.get("daily_revenue", {}), "float64")
+            self.daily_orders = _daily_series(state.get("daily_orders", {}), "int64")
+            self.product_counts = pd.Series(state.get("product_counts", {}), dtype="int64")
+        except Exception as e:
+            print(f"⚠️ State analitik ora kewaca, diitung ulang: {e}")
+            self.last_id = 0
+            self.daily_revenue = _daily_series({}, "float64")
+            self.daily_orders = _daily_series({}, "int64")
+            self.product_counts = pd.Series(dtype="int64")
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        state = {
+            "last_id": self.last_id,
+            "daily_revenue": {d.strftime("%Y-%m-%d"): float(v) for d, v in self.daily_revenue.items()},
+            "daily_orders": {d.strftime("%Y-%m-%d"): int(v) for d, v in self.daily_orders.items()},
+            "product_counts": {k: int(v) for k, v in self.product_counts.items()},
+        }
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    # -- Agregasi --
+    def _product_names(self, detail_items):
+        items = detail_items.fillna("").astype(str).str.replace(r"\s*\([^()]*\)\s*$", "", regex=True)
+        parts = items.str.split(ITEM_SPLIT, regex=True).explode().dropna().str.lower()
+        cleaned = (
+            parts.str.replace(QTY_PATTERN, " ", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip()
+            .reset_index(drop=True)
+        )
+        cleaned = cleaned[cleaned.str.len() > 2]
+        names = pd.Series(None, index=cleaned.index, dtype="object")
+        # Jeneng katalog sing paling dawa menang (contone "stiker vinyl glossy" vs "stiker")
+        for key in sorted(self._catalog, key=len, reverse=True):
+            mask = names.isna() & cleaned.str.contains(key, regex=False)
+            names[mask] = self._catalog[key]
+        return names.fillna(cleaned)
+
+    def _aggregate(self, rows):
+        df = pd.DataFrame(rows)
+        days = (
+            pd.to_datetime(df["created_at"], utc=True, errors="coerce")
+            .dt.tz_convert(ANALYTICS_TZ)
+            .dt.normalize()
+            .dt.tz_localize(None)
+        )
+        totals = pd.to_numeric(df["total_biaya"], errors="coerce").fillna(0.0)
+        self.daily_revenue = self.daily_revenue.add(totals.groupby(days).sum(), fill_value=0.0).sort_index()
+        self.daily_orders = self.daily_orders.add(totals.groupby(days).size(), fill_value=0).astype("int64").sort_index()
+        if "detail_items" in df:
+            counts = self._product_names(df["detail_items"]).value_counts()
+            self.product_counts = self.product_counts.add(counts, fill_value=0).astype("int64")
+        self.last_id = int(pd.to_numeric(df["id"]).max())
+
+    def refresh(self, force=False):
+        """Maca order anyar wae (id > last_id). Mbalekake jumlah order anyar."""
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return 0
+        with self._lock:
+            self._next_refresh = now + self.refresh_interval
+            new_rows = 0
+            while True:
+                rows = self.loader(self.last_id, self.batch_size)
+                if not rows:
+                    break
+                self._aggregate(rows)
+                new_rows += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+            if new_rows:
+                self._save_state()
+            return new_rows
+
+    # -- Query kanggo dashboard --
+    def revenue(self, freq="D", days=None):
+        series = self.daily_revenue
+        if series.empty:
+            return series
+        if days is not None:
+            series = series[series.index >= series.index.max() - pd.Timedelta(days=days - 1)]
+        if freq == "W":
+            # Minggu diwiwiti Senin
+            series = series.resample("W-MON", label="left", closed="left").sum()
+        return series
+
+    def top_products(self, n=10):
+        return self.product_counts.sort_values(ascending=False).head(n)
+
+    def totals(self, days=None):
+        revenue, orders = self.daily_revenue, self.daily_orders
+        if revenue.empty:
+            return 0.0, 0
+        if days is not None:
+            today = pd.Timestamp.now(tz=ANALYTICS_TZ).tz_localize(None).normalize()
+            since = today - pd.Timedelta(days=days - 1)
+            revenue, orders = revenue[revenue.index >= since], orders[orders.index >= since]
+        return float(revenue.sum()), int(orders.sum())
+
+
+def read_funnel(days=30, path=ANALYTICS_DB_PATH):
+    """DataFrame: baris = dina, kolom = tahap funnel, isi = jumlah chat unik."""
+    since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    try:
+        conn = connect_funnel_db(path)
+        try:
+            rows = conn.execute(
+                "SELECT day, event, COUNT(*) FROM funnel_events WHERE day >= ? GROUP BY day, event", (since,)
+            ).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"❌ ERROR Funnel (read): {e}")
+        rows = []
+    df = pd.DataFrame(rows, columns=["day", "event", "chats"])
+    table = df.pivot_table(index="day", columns="event", values="chats", aggfunc="sum", fill_value=0)
+    return table.reindex(columns=FUNNEL_EVENTS, fill_value=0).sort_index()
@@ -3,9 +3,13 @@ import pandas as pd
 import asyncio
 import threading
 import os
+import sys
+import subprocess
 from database import DatabaseManager
-from llm_service import LLMService
-from bot import TelegramBot
+from bot_status import read_worker_statuses, read_supervisor_status, summarize_statuses
+from metrics import merge_snapshots
+from vector_index import read_index_meta
+from analytics import SalesAnalytics, read_funnel
 from dotenv import load_dotenv
 
 # 1. LOAD CONFIGURATION
@@ -38,18 +42,44 @@ def get_db_manager():
 db = get_db_manager()
 
 # ==========================================
-# 🤖 BOT RUNNER (Background Thread)
+# 🤖 BOT RUNNER
 # ==========================================
+# BOT_RUN_MODE:
+# - process  : bot mlaku nang proses dhewe (supervisor.py), dashboard mung maca status.
+# - thread   : cara lawas, bot mlaku nang thread daemon njero proses Streamlit.
+# - external : bot dijalanake dhewe saka njaba (systemd/docker), dashboard mung maca status.
+BOT_RUN_MODE = os.getenv("BOT_RUN_MODE", "process")
+
 @st.cache_resource
 def start_bot_background():
-    """Njalanno Bot Telegram nang jalur (thread) liyane."""
+    """Njalanno Bot Telegram miturut BOT_RUN_MODE."""
     token = st.secrets.get("TELEGRAM_TOKEN") or os.getenv("TELEGRAM_TOKEN")
     
     if not token:
         return "❌ Token TELEGRAM_TOKEN ora ditemokake ing Secrets!"
 
+    if BOT_RUN_MODE == "external":
+        return None
+
+    if BOT_RUN_MODE == "process":
+        supervisor = read_supervisor_status()
+        if supervisor and supervisor["alive"]:
+            # Supervisor wis mlaku (contone sakwise Streamlit reload), ora usah start maneh
+            return None
+        env = dict(os.environ, TELEGRAM_TOKEN=token)
+        subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "supervisor.py")],
+            env=env,
+            start_new_session=True,
+        )
+        return None
+
     def runner():
         global db
+        # Import abot (LangChain) mung dibutuhake nang mode thread
+        from llm_service import LLMService
+        from bot import TelegramBot
+
         # Gunakake model Llama 3 sing pinter (70B) kanggo Lead Qualifier
         llm_srv = LLMService("Groq Llama 3") 
         
@@ -67,10 +97,42 @@ def start_bot_background():
     # Start thread
     t = threading.Thread(target=runner, daemon=True)
     t.start()
-    return "✅ Bot Telegram Aktif (Background)"
+    return None
+
+# Jalankan Bot otomatis (None = ora onok error pas start)
+bot_start_error = start_bot_background()
+
+# ==========================================
+# 📄 ORDER PAGINATION (Cached)
+# ==========================================
+ORDER_PAGE_SIZES = [25, 50, 100]
+ORDER_STATUSES = ["Menunggu Pembayaran", "Proses", "Selesai", "Batal"]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_orders_page(_db, limit, before_id, status, date_from, date_to, customer):
+    """Siji kaca order saka server; di-cache ben rerun Streamlit ora query maneh."""
+    return _db.get_orders_page(
+        limit=limit, before_id=before_id, status=status,
+        date_from=date_from, date_to=date_to, customer=customer
+    )
+
+# ==========================================
+# 📊 ANALITIK (Cached)
+# ==========================================
+@st.cache_resource(show_spinner=False)
+def get_sales_analytics(_db):
+    """Agregat urip sak suwene proses Streamlit; saben rerun mung njupuk order anyar."""
+    res = _db.get_all_products()
+    catalog = [p.get("nama_produk") for p in (res.data if res else [])]
+    return SalesAnalytics(_db.get_orders_since, catalog=catalog)
 
-# Jalankan Bot otomatis
-status_bot = start_bot_background()
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_status_counts(_db, statuses):
+    return _db.count_orders_by_status(statuses)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_funnel(days):
+    return read_funnel(days)
 
 # ==========================================
 # 🖥️ ADMIN DASHBOARD CLASS
@@ -84,27 +146,87 @@ class AdminDashboard:
             st.title("🖨️ Spectrum Printing")
             st.divider()
             
-            # Status Indikator
-            if status_bot and "✅" in status_bot:
-                st.success(status_bot)
-            else:
-                st.error(status_bot or "❌ Bot mati/error")
+            # Status Indikator (saka heartbeat file status worker bot)
+            self.render_bot_status()
             
             st.info("Bot otomatis dadi Lead Qualifier lan Konsultan Teknis (RAG).")
             
             if st.button("🔄 Refresh Data"):
                 st.rerun()
 
+    def render_bot_status(self):
+        if bot_start_error:
+            st.error(bot_start_error)
+            return
+
+        summary = summarize_statuses(read_worker_statuses())
+        if summary["workers_alive"] == 0:
+            st.error("❌ Bot mati/error (ora onok heartbeat)")
+            return
+
+        st.success(f"✅ Bot Telegram Aktif ({summary['workers_alive']}/{summary['workers_total']} worker)")
+        c1, c2 = st.columns(2)
+        c1.metric("Pesen/menit", summary["messages_per_min"])
+        c2.metric("Latensi rata-rata", f"{summary['avg_latency']:.1f}s")
+        if summary["errors_total"]:
+            st.caption(f"⚠️ {summary['errors_total']} error wiwit worker start")
+
     def render_orders_tab(self):
         st.header("📦 Manajemen Pesanan")
         if not self.db:
             st.warning("Database ora nyambung. Cek konfigurasi.")
             return
 
-        res = self.db.get_all_orders()
-        if res and res.data:
-            df = pd.DataFrame(res.data)
+        # Order sing wis entuk nomer nanging gagal ditulis menyang Supabase
+        dead_letters = self.db.order_writer.dead_letter_count()
+        if dead_letters:
+            d1, d2 = st.columns([4, 1])
+            d1.error(f"☠️ {dead_letters} order gagal ditulis menyang Supabase (tabel order_dead_letter nang spool).")
+            if d2.button("🔁 Kirim maneh"):
+                self.db.order_writer.requeue_dead_letters()
+                st.rerun()
+
+        # Filter (diproses nang server, dudu nang pandas)
+        f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+        with f1:
+            status = st.selectbox("Status:", ["Kabeh"] + ORDER_STATUSES)
+        with f2:
+            dates = st.date_input("Rentang Tanggal:", value=())
+        with f3:
+            customer = st.text_input("Nama Pelanggan:").strip()
+        with f4:
+            page_size = st.selectbox("Per Kaca:", ORDER_PAGE_SIZES)
+
+        status = None if status == "Kabeh" else status
+        date_from = dates[0] if len(dates) > 0 else None
+        date_to = dates[1] if len(dates) > 1 else date_from
+
+        # Cursor stack per kombinasi filter; filter ganti -> bali menyang kaca 1
+        filter_key = (status, date_from, date_to, customer, page_size)
+        if st.session_state.get("order_filter_key") != filter_key:
+            st.session_state.order_filter_key = filter_key
+            st.session_state.order_cursors = [None]
+        cursors = st.session_state.order_cursors
+
+        rows, next_cursor = fetch_orders_page(
+            self.db, page_size, cursors[-1], status, date_from, date_to, customer or None
+        )
+
+        if rows:
+            df = pd.DataFrame(rows)
             st.dataframe(df, use_container_width=True)
+
+            p1, p2, p3 = st.columns([1, 2, 1])
+            with p1:
+                if st.button("⬅️ Sadurunge", disabled=len(cursors) == 1):
+                    cursors.pop()
+                    st.rerun()
+            with p2:
+                st.caption(f"Kaca {len(cursors)}")
+            with p3:
+                if st.button("Sabanjure ➡️", disabled=next_cursor is None):
+                    cursors.append(next_cursor)
+                    st.rerun()
             
             st.divider()
             col1, col2 = st.columns(2)
@@ -114,8 +236,12 @@ class AdminDashboard:
                 new_status = st.selectbox("Update Status:", ["Proses", "Selesai", "Batal"])
                 if st.button("Update Status"):
                     self.db.update_order_status(order_id, new_status)
+                    fetch_orders_page.clear()
+                    fetch_status_counts.clear()
                     st.success(f"Order {order_id} diupdate dadi {new_status}")
                     st.rerun()
+        elif len(cursors) > 1:
+            st.info("Ora onok order maneh nang kaca iki.")
         else:
             st.info("Durung onok data orderan masuk.")
 
@@ -144,10 +270,15 @@ class AdminDashboard:
                     st.rerun()
 
     def render_knowledge_status(self):
-        st.header("🧠 AI Knowledge Base (Qdrant)")
+        st.header("🧠 AI Knowledge Base")
         st.info("Data ing ngisor iki disimpen nang Vector Database kanggo fitur Konsultasi AI.")
         
-        st.success("📡 Status: Qdrant Cloud Connected")
+        meta = read_index_meta()
+        if meta and meta.get("count"):
+            updated = pd.to_datetime(meta["updated_at"], unit="s").strftime("%d-%m-%Y %H:%M")
+            st.success(f"💾 Index lokal: {meta['count']} chunk (update {updated})")
+        else:
+            st.success("📡 Status: Qdrant Cloud Connected")
         st.markdown("""
         **Topik sing dikuasai Bot (RAG):**
         * **Spek Bahan:** Art Paper, Art Carton, PVC, lsp.
@@ -156,21 +287,116 @@ class AdminDashboard:
         * **Estimasi:** Waktu pengerjaan tiap jenis produk.
         """)
         
-        st.warning("⚠️ Kanggo update data iki, gunakake script `upload_to_qdrant.py` saka terminal.")
+        st.warning(
+            "⚠️ Kanggo update data iki, lebokke dokumen (.md/.txt) nang folder `knowledge/` "
+            "banjur jalanake `python knowledge_ingest.py` (tambah `--qdrant` kanggo sinkron menyang Qdrant Cloud)."
+        )
+
+    def render_analytics_tab(self):
+        st.header("📊 Analitik Penjualan")
+        if not self.db:
+            st.warning("Database ora nyambung. Cek konfigurasi.")
+            return
+
+        analytics = get_sales_analytics(self.db)
+        try:
+            analytics.refresh()
+        except Exception as e:
+            st.warning(f"Gagal njupuk order anyar: {e}")
+
+        revenue_today, orders_today = analytics.totals(days=1)
+        revenue_week, orders_week = analytics.totals(days=7)
+        funnel = fetch_funnel(30)
+        week = funnel.tail(7).sum()
+        conversion = (week["checkout"] / week["chat"] * 100) if week["chat"] else 0.0
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Omzet Dina Iki", f"Rp {revenue_today:,.0f}", f"{orders_today} order")
+        c2.metric("Omzet 7 Dina", f"Rp {revenue_week:,.0f}", f"{orders_week} order")
+        c3.metric("Chat 7 Dina", int(week["chat"]))
+        c4.metric("Konversi Checkout", f"{conversion:.1f}%")
+
+        g1, g2 = st.columns(2)
+        with g1:
+            st.subheader("Omzet Harian (60 dina)")
+            st.bar_chart(analytics.revenue("D", days=60).rename("Omzet"))
+        with g2:
+            st.subheader("Omzet Mingguan")
+            st.bar_chart(analytics.revenue("W").tail(26).rename("Omzet"))
+
+        g3, g4 = st.columns(2)
+        with g3:
+            st.subheader("Order per Status")
+            counts = fetch_status_counts(self.db, tuple(ORDER_STATUSES))
+            st.bar_chart(pd.Series(counts, name="Jumlah"))
+        with g4:
+            st.subheader("Produk Terlaris")
+            top = analytics.top_products(10)
+            st.dataframe(top.rename_axis("Produk").reset_index(name="Order"),
+                         use_container_width=True, hide_index=True)
+
+        st.subheader("Funnel Bot (chat unik per dina)")
+        if funnel.empty:
+            st.info("Durung onok data funnel saka bot.")
+        else:
+            st.line_chart(funnel)
+        st.caption(f"Order diwaca nganti id {analytics.last_id}. Omzet = order mlebu (kalebu sing mengko Batal).")
+
+    def render_performance_tab(self):
+        st.header("📈 Performa Bot")
+        statuses = [s for s in read_worker_statuses() if s.get("alive") and s.get("metrics")]
+        if not statuses:
+            st.info("Durung onok metrik saka worker bot sing urip.")
+            return
+
+        merged = merge_snapshots([s["metrics"] for s in statuses])
+        rows = [
+            {
+                "Tahap": name,
+                "Jumlah": h["count"],
+                "p50 (ms)": round(h["p50"] * 1000, 1),
+                "p95 (ms)": round(h["p95"] * 1000, 1),
+                "p99 (ms)": round(h["p99"] * 1000, 1),
+                "Max (ms)": round(h["max"] * 1000, 1),
+            }
+            for name, h in sorted(merged["histograms"].items())
+        ]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        if merged["counters"]:
+            st.subheader("Counter")
+            st.dataframe(
+                pd.DataFrame(sorted(merged["counters"].items()), columns=["Counter", "Nilai"]),
+                use_container_width=True, hide_index=True,
+            )
+
+        # Statistik router model saben worker (latensi EWMA, error, menang balapan)
+        backends = [
+            {"Worker": s.get("worker"), "Backend": name, "Latensi EWMA (ms)": round((b["latency"] or 0) * 1000),
+             "Error rate": b["error_rate"], "Panggilan": b["calls"], "Menang": b["wins"],
+             "Sehat": "✅" if b["healthy"] else "⏸️"}
+            for s in statuses for name, b in sorted((s.get("llm_router") or {}).items())
+        ]
+        if backends:
+            st.subheader("Backend LLM")
+            st.dataframe(pd.DataFrame(backends), use_container_width=True, hide_index=True)
 
     def main(self):
         self.render_sidebar()
         
         st.title("Admin Control Center")
-        tab_order, tab_produk, tab_ai = st.tabs([
+        tab_order, tab_produk, tab_ai, tab_analytics, tab_perf = st.tabs([
             "📋 Daftar Order", 
             "🏷️ Katalog Produk", 
-            "🧠 AI Knowledge"
+            "🧠 AI Knowledge",
+            "📊 Analitik",
+            "📈 Performa Bot"
         ])
         
         with tab_order: self.render_orders_tab()
         with tab_produk: self.render_products_tab()
         with tab_ai: self.render_knowledge_status()
+        with tab_analytics: self.render_analytics_tab()
+        with tab_perf: self.render_performance_tab()
 
 # 4. EXECUTION
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# ⚙️ KONFIGURASI POOL
+# ==========================================
+# Pool kanggo I/O sinkron (Supabase, Qdrant) lan pool kapisah kanggo embedding
+# (CPU-heavy), supaya query lemot ora ngalangi embedding lan sebalike.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+EMBED_POOL_SIZE = int(os.getenv("EMBED_POOL_SIZE", "2"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "15"))
+
+_db_pool = None
+_embed_pool = None
+
+
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        _db_pool = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="spectrum-db")
+    return _db_pool
+
+
+def get_embed_pool():
+    global _embed_pool
+    if _embed_pool is None:
+        _embed_pool = ThreadPoolExecutor(max_workers=EMBED_POOL_SIZE, thread_name_prefix="spectrum-embed")
+    return _embed_pool
+
+
+async def _run_in_pool(pool, timeout, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    # wait_for mbebasake caller pas timeout; thread-e tetep rampung dhewe nang pool
+    return await asyncio.wait_for(loop.run_in_executor(pool, call), timeout)
+
+
+async def run_db(func, *args, timeout=None, **kwargs):
+    """Nglakoni panggilan DB/network sinkron nang pool DB tanpa ngalangi event loop."""
+    return await _run_in_pool(get_db_pool(), timeout or DB_TIMEOUT, func, *args, **kwargs)
+
+
+async def run_embed(func, *args, timeout=None, **kwargs):
+    """Nglakoni embedding (CPU) nang pool kapisah."""
+    return await _run_in_pool(get_embed_pool(), timeout or EMBED_TIMEOUT, func, *args, **kwargs)
+
+
+def shutdown_pools(wait=False):
+    """Nutup kabeh pool (dienggo pas bot mandheg)."""
+    global _db_pool, _embed_pool
+    for pool in (_db_pool, _embed_pool):
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+    _db_pool = None
+    _embed_pool = None
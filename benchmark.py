@@ -0,0 +1,457 @@
+"""Benchmark offline jalur pesen bot, tanpa Telegram/Gemini/Supabase/Qdrant Cloud.
+
+Stand-in lokal (kabeh nganggo latensi sing bisa diatur):
+- FakeChatModel      : model chat sing ngetokake tool call miturut skrip.
+- --router           : loro FakeChatModel liwat ModelRouter (primer kadang macet/error).
+- InMemoryDatabase   : dobel DatabaseManager nang memori.
+- Qdrant ":memory:"  : koleksi spectrum_knowledge lokal + embedding deterministik.
+- FakeUpdate/Context : update Telegram sintetis saka N customer.
+
+    python benchmark.py --customers 50 --messages 5 --llm-latency 0.8
+
+Laporan: throughput, latensi p50/p95/p99, tambahan memori, lag event loop,
+lan histogram saben tahap saka metrics.py.
+
+Kabeh file sing biasane ditulis bot (funnel, trace, sesi, status, spool) diarahake
+menyang direktori sementara, dadi benchmark aman dilakoni nang direktori deploy.
+"""
+import os
+import atexit
+import shutil
+import tempfile
+
+# Kudu sakdurunge modul bot di-import: path-path iki diwaca pas import
+_SANDBOX_DIR = tempfile.mkdtemp(prefix="spectrum-bench-")
+atexit.register(shutil.rmtree, _SANDBOX_DIR, ignore_errors=True)
+os.environ.update({
+    "ANALYTICS_DB_PATH": os.path.join(_SANDBOX_DIR, "analytics.sqlite3"),
+    "ANALYTICS_STATE_PATH": os.path.join(_SANDBOX_DIR, "analytics_state.json"),
+    "TRACE_FILE": os.path.join(_SANDBOX_DIR, "traces.jsonl"),
+    "SESSION_BACKEND": "memory",
+    "SESSION_DB_PATH": os.path.join(_SANDBOX_DIR, "sessions.sqlite3"),
+    "BOT_STATUS_DIR": os.path.join(_SANDBOX_DIR, "bot_status"),
+    "CHANGE_BUS_PATH": os.path.join(_SANDBOX_DIR, "change_bus.sqlite3"),
+    "ORDER_SPOOL_PATH": os.path.join(_SANDBOX_DIR, "orders_spool.sqlite3"),
+})
+
+import time
+import random
+import asyncio
+import argparse
+import tracemalloc
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import tools
+import metrics
+from bot import TelegramBot
+from llm_service import LLMService
+from product_index import ProductIndex, IndexResult
+from faq_engine import FAQIndex
+from update_scheduler import ChatOrderedUpdateProcessor
+
+EMBED_DIM = 384
+
+SAMPLE_PRODUCTS = [
+    {"id": 1, "nama_produk": "Banner Flexi 280gr", "harga_satuan": 25000, "satuan": "meter", "bahan": "Flexi China"},
+    {"id": 2, "nama_produk": "Stiker Vinyl Glossy", "harga_satuan": 5000, "satuan": "lembar", "bahan": "Vinyl"},
+    {"id": 3, "nama_produk": "Kartu Nama", "harga_satuan": 35000, "satuan": "box", "bahan": "Art Carton 260"},
+    {"id": 4, "nama_produk": "Brosur A4", "harga_satuan": 1500, "satuan": "lembar", "bahan": "Art Paper 150"},
+    {"id": 5, "nama_produk": "Jilid Hardcover", "harga_satuan": 45000, "satuan": "pcs", "bahan": "Board + Buffalo"},
+]
+
+SAMPLE_KNOWLEDGE = [
+    "Art Paper permukaane licin lan tipis, cocok kanggo brosur. Art Carton luwih kandel, cocok kanggo kartu nama.",
+    "Jilid hardcover butuh wektu 2-3 dina kerja, softcover 1 dina.",
+    "File dikirim liwat email, Google Drive utawa WA. Gunakake bleed 3mm saben sisi.",
+    "Vinyl tahan banyu, cocok kanggo stiker outdoor. Chromo luwih murah nanging ora tahan banyu.",
+    "Ukuran A3+ yaiku 32 x 48 cm, A4 yaiku 21 x 29.7 cm.",
+]
+
+SAMPLE_FAQ = [
+    {"pertanyaan": "Apakah bisa kirim file lewat Google Drive?", "jawaban": "Bisa Kak, kirim link Drive-nya ke WA admin ya."},
+    {"pertanyaan": "Apakah bisa cetak satuan?", "jawaban": "Bisa Kak, minimal order 1 pcs kecuali kartu nama (1 box)."},
+    {"pertanyaan": "Apakah melayani pengiriman luar kota?", "jawaban": "Bisa Kak, dikirim lewat ekspedisi, ongkir ditanggung pembeli."},
+]
+
+SAMPLE_QUESTIONS = [
+    "bisa cetak satuan kak?",
+    "harga banner berapa kak?",
+    "beda art paper sama art carton apa?",
+    "berapa lama jilid hardcover?",
+    "ada stiker apa saja?",
+    "cek status ORDER-241203101530",
+    "oke makasih kak",
+]
+
+
+# ==========================================
+# 🤖 STAND-IN LLM
+# ==========================================
+class FakeChatModel(BaseChatModel):
+    """Model chat skrip: langkah pertama milih tool miturut kata kunci, langkah
+    sabanjure (sakwise ToolMessage) mbalekake jawaban final.
+    """
+
+    latency: float = 0.5
+    jitter: float = 0.2
+    error_rate: float = 0.0
+    # Sebagian panggilan macet (latency x stall_factor) kanggo nyimulasi tail latency
+    stall_rate: float = 0.0
+    stall_factor: float = 10.0
+
+    @property
+    def _llm_type(self):
+        return "spectrum-fake-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _decide(self, messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Siap Kak! {str(last.content)[:200]}")
+
+        text = str(last.content).lower()
+        call = None
+        if "order-" in text:
+            nomor = text.upper().split("ORDER-", 1)[1].split()[0]
+            call = ("cek_status_order", {"nomor_order": f"ORDER-{nomor}"})
+        elif any(k in text for k in ("beda", "lama", "bahan", "ukuran", "file")):
+            call = ("konsultasi_cetak", {"query": str(last.content)})
+        elif any(k in text for k in ("harga", "ada", "produk", "stiker", "banner")):
+            call = ("cari_produk", {"query": str(last.content)})
+
+        if call is None:
+            return AIMessage(content="Sama-sama Kak, ditunggu order-e ya!")
+        name, args = call
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": f"call_{random.getrandbits(32):x}"}],
+        )
+
+    def _delay(self):
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter) * self.latency)
+        if self.stall_rate and random.random() < self.stall_rate:
+            delay *= self.stall_factor
+        return delay
+
+    def _result(self, messages):
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("fake backend error")
+        return ChatResult(generations=[ChatGeneration(message=self._decide(messages))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay())
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        return self._result(messages)
+
+
+class FakeLLMService(LLMService):
+    def __init__(self, llm_latency=0.5, llm_jitter=0.2, router=False, stall_rate=0.0,
+                 error_rate=0.0, backup_latency=None):
+        super().__init__("benchmark-fake")
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.use_router = router
+        self.stall_rate = stall_rate
+        self.error_rate = error_rate
+        self.backup_latency = backup_latency if backup_latency is not None else llm_latency * 1.5
+
+    def _get_backends(self):
+        return [
+            ("primary", FakeChatModel(latency=self.llm_latency, jitter=self.llm_jitter,
+                                      stall_rate=self.stall_rate, error_rate=self.error_rate)),
+            ("backup", FakeChatModel(latency=self.backup_latency, jitter=self.llm_jitter)),
+        ]
+
+    def _get_llm(self):
+        if self.use_router:
+            return super()._get_llm()
+        return FakeChatModel(latency=self.llm_latency, jitter=self.llm_jitter,
+                             stall_rate=self.stall_rate, error_rate=self.error_rate)
+
+
+# ==========================================
+# 🗄️ STAND-IN DATABASE & QDRANT
+# ==========================================
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class InMemoryDatabase:
+    """Dobel DatabaseManager: interface padha, data nang memori, latensi disimulasi."""
+
+    def __init__(self, latency=0.05, products=None):
+        self.latency = latency
+        self.products = list(products or SAMPLE_PRODUCTS)
+        self.orders = {}
+        self.faq = list(SAMPLE_FAQ)
+        self.product_index = ProductIndex(self._load_all_products)
+        self.faq_index = FAQIndex(lambda: list(self.faq))
+        self.faq_index.refresh()
+
+    def warmup_indexes(self):
+        # Benchmark ngukur jalur panas: katalog dimuat sinkron sakdurunge customer teka
+        self.product_index.refresh()
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _load_all_products(self):
+        self._sleep()
+        return list(self.products)
+
+    def search_products(self, query):
+        return IndexResult(self.product_index.search(query))
+
+    def answer_faq(self, text):
+        return self.faq_index.answer(text)
+
+    def get_faq_summary(self):
+        self._sleep()
+        return _Result(self.faq[:20])
+
+    def get_all_faq(self):
+        self._sleep()
+        return _Result(list(self.faq))
+
+    def create_order(self, nama, items, detail, total=0, idempotency_key=None):
+        self._sleep()
+        nomor = f"ORDER-{len(self.orders) + 1:012d}"
+        self.orders[nomor] = {"nomor_order": nomor, "nama_pelanggan": nama, "status_order": "Menunggu Pembayaran",
+                              "total_biaya": total, "detail_items": f"{items} ({detail})"}
+        return nomor
+
+    def check_order_status(self, nomor_order):
+        self._sleep()
+        order = self.orders.get(nomor_order)
+        return _Result([order] if order else [])
+
+    def get_all_products(self):
+        self._sleep()
+        return _Result(list(self.products))
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    """Embedding deterministik kanthi latensi CPU/IO sing disimulasi."""
+
+    latency: float = 0.02
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_query(text)
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def build_local_qdrant(embeddings, latency=0.02):
+    """Koleksi spectrum_knowledge nang Qdrant lokal (":memory:")."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    class SlowQdrant(QdrantClient):
+        def search(self, *args, **kwargs):
+            if latency:
+                time.sleep(latency)
+            return super().search(*args, **kwargs)
+
+    client = SlowQdrant(":memory:")
+    client.recreate_collection(
+        collection_name=tools.KB_COLLECTION,
+        vectors_config=VectorParams(size=EMBED_DIM, distance=Distance.COSINE),
+    )
+    vectors = DeterministicFakeEmbedding(size=EMBED_DIM).embed_documents(SAMPLE_KNOWLEDGE)
+    client.upsert(
+        collection_name=tools.KB_COLLECTION,
+        points=[PointStruct(id=i, vector=v, payload={"content": c})
+                for i, (v, c) in enumerate(zip(vectors, SAMPLE_KNOWLEDGE))],
+    )
+    return client
+
+
+# ==========================================
+# 💬 STAND-IN TELEGRAM
+# ==========================================
+class FakeChat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class FakeMessage:
+    def __init__(self, text, on_reply):
+        self.text = text
+        self._on_reply = on_reply
+
+    async def reply_text(self, text, **kwargs):
+        self._on_reply(text)
+        return FakeSentMessage(text)
+
+
+class FakeSentMessage:
+    def __init__(self, text):
+        self.text = text
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+        return self
+
+
+class FakeUpdate:
+    def __init__(self, chat_id, text, on_reply):
+        self.effective_chat = FakeChat(chat_id)
+        self.message = FakeMessage(text, on_reply)
+
+
+class FakeBotApi:
+    async def send_chat_action(self, chat_id, action):
+        return True
+
+
+class FakeContext:
+    bot = FakeBotApi()
+
+
+# ==========================================
+# 📊 DRIVER
+# ==========================================
+async def _loop_lag_monitor(samples, stop, interval=0.01):
+    """Ngukur telat-e event loop: selisih antarane sleep sing dijaluk lan sing kedadeyan."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - t0 - interval)
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_benchmark(customers=20, messages=5, think_time=0.2, concurrency=32,
+                        llm_latency=0.5, db_latency=0.05, embed_latency=0.02, qdrant_latency=0.02,
+                        router=False, stall_rate=0.0, llm_error_rate=0.0, backup_latency=None,
+                        coalesce_window=0.0, fragments=1, fragment_gap=0.3):
+    db = InMemoryDatabase(latency=db_latency)
+    db.orders["ORDER-241203101530"] = {"nomor_order": "ORDER-241203101530", "status_order": "Proses",
+                                       "updated_at": "2024-12-03"}
+    embeddings = SlowEmbeddings(size=EMBED_DIM, latency=embed_latency)
+    tools.override_resources(qdrant_client=build_local_qdrant(embeddings, qdrant_latency), embeddings=embeddings)
+
+    llm_service = FakeLLMService(llm_latency, router=router, stall_rate=stall_rate,
+                                 error_rate=llm_error_rate, backup_latency=backup_latency)
+    bot = TelegramBot("benchmark-token", llm_service, db, coalesce_window=coalesce_window)
+    bot.llm_service.warmup(db)
+    db.warmup_indexes()
+    processor = ChatOrderedUpdateProcessor(max_concurrent_updates=concurrency)
+    context = FakeContext()
+
+    latencies = []
+    errors = 0
+    lag = []
+    stop = asyncio.Event()
+
+    async def customer(chat_id):
+        nonlocal errors
+        for _ in range(messages):
+            text = random.choice(SAMPLE_QUESTIONS)
+            done = asyncio.get_running_loop().create_future()
+            t0 = time.perf_counter()
+
+            def on_reply(reply):
+                if not done.done():
+                    done.set_result(reply)
+
+            # --fragments: pesen dipecah kaya customer sing ngetik sepotong-sepotong
+            words = text.split()
+            size = max(1, -(-len(words) // fragments))
+            parts = [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+            for i, part in enumerate(parts):
+                if i:
+                    await asyncio.sleep(random.uniform(0.5, 1.5) * fragment_gap)
+                update = FakeUpdate(chat_id, part, on_reply)
+                await processor.process_update(update, bot._handle_message(update, context))
+            try:
+                await asyncio.wait_for(asyncio.shield(done), timeout=60)
+                latencies.append(time.perf_counter() - t0)
+                if str(done.result()).startswith("⚠️"):
+                    errors += 1
+            except asyncio.TimeoutError:
+                errors += 1
+            await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+    tracemalloc.start()
+    mem_before = tracemalloc.get_traced_memory()[0]
+    monitor = asyncio.create_task(_loop_lag_monitor(lag, stop))
+    t_start = time.perf_counter()
+    await asyncio.gather(*(customer(100000 + i) for i in range(customers)))
+    elapsed = time.perf_counter() - t_start
+    stop.set()
+    await monitor
+    mem_after, mem_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = customers * messages
+    print(f"🧪 {customers} customer x {messages} pesen = {total} pesen nang {elapsed:.2f}s")
+    print(f"   throughput : {total / elapsed:.1f} pesen/s")
+    print(f"   latensi    : p50={_pct(latencies, .5) * 1000:.0f}ms p95={_pct(latencies, .95) * 1000:.0f}ms "
+          f"p99={_pct(latencies, .99) * 1000:.0f}ms max={max(latencies or [0]) * 1000:.0f}ms")
+    print(f"   error      : {errors}")
+    print(f"   memori     : +{(mem_after - mem_before) / 1024:.0f} KiB (peak {mem_peak / 1024:.0f} KiB)")
+    print(f"   loop lag   : p99={_pct(lag, .99) * 1000:.1f}ms max={max(lag or [0]) * 1000:.1f}ms")
+    print("   tahap (p50 / p95 / p99 ms):")
+    for name, h in sorted(metrics.snapshot()["histograms"].items()):
+        print(f"     {name:28s} n={h['count']:5d}  {h['p50'] * 1000:7.1f} / {h['p95'] * 1000:7.1f} / {h['p99'] * 1000:7.1f}")
+    if bot.coalescer is not None:
+        c = bot.coalescer.stats()
+        print(f"   coalescing : {c['fragments']} fragmen -> {c['turns']} turn "
+              f"({c['superseded']} disusul, {c['invocations_saved']} invocation dihemat)")
+    if llm_service.router_stats():
+        print("   backend LLM:")
+        for name, b in llm_service.router_stats().items():
+            print(f"     {name:10s} ewma={(b['latency'] or 0) * 1000:6.0f}ms err={b['error_rate']:.2f} "
+                  f"calls={b['calls']} wins={b['wins']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline SpectrumBot")
+    parser.add_argument("--customers", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--db-latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--qdrant-latency", type=float, default=0.02)
+    parser.add_argument("--router", action="store_true", help="Liwat ModelRouter karo backend cadangan")
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--backup-latency", type=float, default=None)
+    parser.add_argument("--coalesce-window", type=float, default=0.0, help="0 = coalescing mati")
+    parser.add_argument("--fragments", type=int, default=1, help="Pesen dipecah dadi N fragmen")
+    parser.add_argument("--fragment-gap", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(run_benchmark(
+        customers=args.customers, messages=args.messages, think_time=args.think_time,
+        concurrency=args.concurrency, llm_latency=args.llm_latency, db_latency=args.db_latency,
+        embed_latency=args.embed_latency, qdrant_latency=args.qdrant_latency,
+        router=args.router, stall_rate=args.stall_rate, llm_error_rate=args.llm_error_rate,
+        backup_latency=args.backup_latency, coalesce_window=args.coalesce_window,
+        fragments=args.fragments, fragment_gap=args.fragment_gap,
+    ))
@@ -1,30 +1,83 @@
+import os
+import time
 import asyncio
 import nest_asyncio
 import traceback
 import urllib.parse  # <<< WAJIB: Kanggo encode link WA
 from telegram import Update, BotCommand  # <<< TAMBAH: BotCommand kanggo Menu
 from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters, CommandHandler
-from langchain_core.messages import AIMessage, HumanMessage
-from llm_service import LLMService
-from database import DatabaseManager 
+from llm_service import LLMService, METRICS_CALLBACK
+from database import DatabaseManager, AsyncDatabaseManager
+from update_scheduler import ChatOrderedUpdateProcessor
+from session_store import create_session_store
+from memory_manager import ConversationMemory
+from tools import warmup_resources, EMBEDDER
+from webhook_server import BOT_MODE, WebhookServer, register_webhook, require_webhook_secret
+from bot_status import BotStatusReporter
+from fast_router import FastPathRouter
+from shop_info import WA_ADMIN
+from streaming import STREAM_REPLIES, stream_agent_reply
+from metrics import METRICS_PORT, span, trace, snapshot, start_metrics_server
+from funnel import FunnelRecorder
+from coalescer import BOT_COALESCE_WINDOW, MessageCoalescer
+
+# Mode polling: buang update lawas pas start (prilaku asli)
+DROP_PENDING_UPDATES = os.getenv("BOT_DROP_PENDING_UPDATES", "1") == "1"
 
 class TelegramBot:
-    def __init__(self, token, llm_service: LLMService, db_manager: DatabaseManager): 
+    def __init__(self, token, llm_service: LLMService, db_manager: DatabaseManager, mode=None, worker_index=0,
+                 coalesce_window=None): 
         self.token = token
         self.llm_service = llm_service
         self.db_manager = db_manager
-        self.user_sessions = {}
+        # polling | webhook | webhook-multi (ndelok webhook_server.py)
+        self.mode = mode or BOT_MODE
+        self.worker_index = worker_index
+        self.webhook_server = None
+        # Heartbeat + throughput kanggo dashboard (file status, ora nyambung langsung)
+        self.status = BotStatusReporter(f"worker-{worker_index}", self.mode)
+        self.status.add_provider("metrics", snapshot)
+        self.status.add_provider("embedder", EMBEDDER.stats)
+        self.status.add_provider("llm_router", llm_service.router_stats)
+        # Panggilan DB sinkron saka jalur bot mlaku nang pool DB, ora nang event loop
+        self.async_db = AsyncDatabaseManager(db_manager)
+        # Intent gampang (cek order, jam buka, alamat, rekening) dijawab tanpa LLM
+        self.fast_router = FastPathRouter(self.async_db)
+        # History chat per chat_id (diwatesi dawane, LRU/TTL, bisa persist nang SQLite)
+        self.sessions = create_session_store()
+        # History dijaga nang njero budget token; turn lawas dadi ringkasan fakta
+        self.memory = ConversationMemory(self.sessions)
+        # Funnel chat -> checkout kanggo tab analitik dashboard
+        self.funnel = FunnelRecorder()
+        # Pesen pecah-pecah saka siji chat digabung dadi siji turn agent (None = mati)
+        window = BOT_COALESCE_WINDOW if coalesce_window is None else coalesce_window
+        self.coalescer = MessageCoalescer(self._run_turn, window=window) if window > 0 else None
+        if self.coalescer is not None:
+            self.status.add_provider("coalescer", MessageCoalescer.stats)
+
+    async def _ordered(self, update, context, handler):
+        """Perintah mlebu antrian coalescer chat iku, ben urut karo turn sing isih antri."""
+        if self.coalescer is not None:
+            self.coalescer.submit_command(update.effective_chat.id, lambda: handler(update, context))
+            return
+        await handler(update, context)
 
     async def _reset_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self._ordered(update, context, self._reset_chat)
+
+    async def _chat_admin_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self._ordered(update, context, self._send_chat_admin)
+
+    async def _reset_chat(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mbusak memori chat user."""
         chat_id = update.effective_chat.id
-        self.user_sessions[chat_id] = []
+        self.sessions.reset(chat_id)
         await update.message.reply_text("🧠 Memori Reset. SpectrumBot siap mulai dari awal, Kak!")
 
-    async def _chat_admin_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def _send_chat_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Ngekei link langsung menyang WhatsApp Admin."""
         chat_id = update.effective_chat.id
-        wa_admin = "6281234567890" # <<< GANTI KARO NOMER WA ADMINE
+        wa_admin = WA_ADMIN
         pesan_otomatis = "Halo Admin Spectrum, saya butuh bantuan manual."
         
         # Encode pesan dadi format URL
@@ -40,39 +93,108 @@ class TelegramBot:
         await update.message.reply_text(teks_balasan, parse_mode="Markdown")
 
     async def _handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        text = update.message.text
         chat_id = update.effective_chat.id
-        
-        if chat_id not in self.user_sessions: 
-            self.user_sessions[chat_id] = []
+        self.funnel.record(chat_id, "chat")
+        if self.coalescer is not None:
+            # Langsung bali: coalescer sing ngenteni chat sepi lan nglakoni turn-e
+            self.coalescer.submit(chat_id, update.message.text, update.message, context)
+            return
+        await self._run_turn(chat_id, update.message.text, update.message, context)
+
+    async def _run_turn(self, chat_id, text, message, context):
+        async with trace("bot.handle_message", chat_id=chat_id):
+            await self._process_message(chat_id, text, message, context)
+
+    async def _process_message(self, chat_id, text, message, context: ContextTypes.DEFAULT_TYPE):
+        started = time.perf_counter()
+
+        # Fast-path: jawaban template tanpa round-trip LLM
+        fast_reply = await self.fast_router.route(text)
+        if fast_reply is not None:
+            async with span("telegram.reply"):
+                await message.reply_text(fast_reply)
+            # Funnel dicathet sakwise balesan metu (turn sing disusul ora kecathet)
+            self.funnel.record(chat_id, "fastpath")
+            self.memory.save_turn(chat_id, text, fast_reply)
+            self.status.record_message(time.perf_counter() - started)
+            return
+
+        # FAQ: pitakon sing wis onok jawabane nang tabel faq, ora perlu agent
+        async with span("bot.faq"):
+            try:
+                faq_reply = await self.async_db.answer_faq(text)
+            except Exception as e:
+                # FAQ mung jalan pintas: nek gagal, pitakon diterusake agent
+                print(f"❌ ERROR FAQ: {e}")
+                faq_reply = None
+        if faq_reply is not None:
+            async with span("telegram.reply"):
+                await message.reply_text(faq_reply)
+            self.funnel.record(chat_id, "faq")
+            self.memory.save_turn(chat_id, text, faq_reply)
+            self.status.record_message(time.perf_counter() - started)
+            return
         
         await context.bot.send_chat_action(chat_id=chat_id, action="typing")
         
-        # Jupuk Executor (Agent)
-        agent = self.llm_service.get_executor(self.db_manager) 
+        # Jupuk Executor (Agent) saka registry, ora dibangun maneh saben pesen
+        with span("bot.executor_setup"):
+            agent = self.llm_service.get_executor(self.db_manager) 
         
         # History Management
-        history = self.user_sessions[chat_id]
-        if len(history) > 10:
-            history = history[-10:]
+        with span("bot.load_history"):
+            summary, history = self.memory.load(chat_id)
         
+        inputs = {"input": text, "chat_history": history, "memory_summary": summary}
+        config = {"callbacks": [METRICS_CALLBACK]}
         try:
-            response = await agent.ainvoke({"input": text, "chat_history": history})
-            reply = response.get("output", "Maaf Kak, aku bingung mau jawab apa. Bisa diulangi?")
+            if STREAM_REPLIES:
+                # Jawaban dikirim bertahap: pesen pertama metu sak cepete, banjur diedit
+                async with span("bot.agent"):
+                    reply = await stream_agent_reply(agent, inputs, message, config, started)
+            else:
+                async with span("bot.agent"):
+                    response = await agent.ainvoke(inputs, config=config)
+                reply = response.get("output", "Maaf Kak, aku bingung mau jawab apa. Bisa diulangi?")
+                async with span("telegram.reply"):
+                    await message.reply_text(reply)
             
+            self.funnel.record(chat_id, "agent")
+            # Link checkout WA saka generate_whatsapp_checkout = lead wis FIX
+            if "wa.me/" in (reply or ""):
+                self.funnel.record(chat_id, "checkout")
+
             # Simpen menyang memori
-            self.user_sessions[chat_id].append(HumanMessage(content=text))
-            self.user_sessions[chat_id].append(AIMessage(content=reply))
-            
-            await update.message.reply_text(reply)
+            self.memory.save_turn(chat_id, text, reply)
+            self.status.record_message(time.perf_counter() - started)
             
         except Exception as e:
             print(f"ERROR: {e}")
             traceback.print_exc()
-            await update.message.reply_text("⚠️ Maaf Kak, sistem lagi ada gangguan teknis. Coba lagi ya!")
+            self.status.record_message(time.perf_counter() - started, ok=False)
+            await message.reply_text("⚠️ Maaf Kak, sistem lagi ada gangguan teknis. Coba lagi ya!")
+
+    async def _prune_sessions_loop(self, interval=600):
+        """Mbusak session sing wis nganggur luwih suwe tinimbang TTL."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sessions.prune()
+            except Exception as e:
+                print(f"❌ ERROR Session Prune: {e}")
 
     async def run(self):
-        app = ApplicationBuilder().token(self.token).build()
+        if self.mode in ("webhook", "webhook-multi"):
+            require_webhook_secret()
+        # Warmup executor sakdurunge nampa pesen pertama
+        self.llm_service.warmup(self.db_manager)
+        # Model embedding & Qdrant dimuat nang background, ora ngalangi startup
+        warmup_resources(background=True)
+        self.db_manager.warmup_indexes()
+
+        # Update diproses bareng (concurrent) kanthi urutan per chat tetep dijaga
+        self.update_processor = ChatOrderedUpdateProcessor()
+        app = ApplicationBuilder().token(self.token).concurrent_updates(self.update_processor).build()
         
         # Register Commands
         app.add_handler(CommandHandler("reset", self._reset_handler))
@@ -90,14 +212,29 @@ class TelegramBot:
         print("🚀 SpectrumBot Is Online & Menu Commands Ready...")
         
         await app.start()
-        await app.updater.start_polling(drop_pending_updates=True)
+        if self.mode == "polling":
+            await app.updater.start_polling(drop_pending_updates=DROP_PENDING_UPDATES)
+        elif self.mode in ("webhook", "webhook-multi"):
+            # Update ditampa server HTTP dhewe lan dilebokke menyang app.update_queue
+            self.webhook_server = WebhookServer(app, reuse_port=self.mode == "webhook-multi")
+            await self.webhook_server.start()
+            if self.worker_index == 0:
+                # Backlog ora dibuang: update sing antri diproses sakwise restart
+                await register_webhook(app.bot)
+        else:
+            raise ValueError(f"BOT_MODE ora dikenal: {self.mode}")
+        self._prune_task = asyncio.create_task(self._prune_sessions_loop())
+        self._status_task = asyncio.create_task(self.status.run())
+        if METRICS_PORT:
+            # Saben worker entuk port dhewe: METRICS_PORT + worker_index
+            self._metrics_server = await start_metrics_server(METRICS_PORT + self.worker_index)
         
         # Njaga bot tetep urip
         stop_event = asyncio.Event()
         await stop_event.wait()
 
-if __name__ == "__main__":
-    import os
+def run_worker(worker_index=0, mode=None):
+    """Entry point siji proses bot (dienggo uga kanggo worker webhook-multi)."""
     from dotenv import load_dotenv
     
     load_dotenv()
@@ -107,8 +244,16 @@ if __name__ == "__main__":
         # Pass secrets/env sesuai kebutuhan DatabaseManager
         db_instance = DatabaseManager(os_getenv_func=os.environ.get)
         llm_service = LLMService("Groq Llama 3") 
-        bot = TelegramBot(token, llm_service, db_instance)
+        bot = TelegramBot(token, llm_service, db_instance, mode=mode, worker_index=worker_index)
         
         asyncio.run(bot.run())
     except Exception as e:
-        print(f"❌ FATAL ERROR: {e}")
\ No newline at end of file
+        print(f"❌ FATAL ERROR (worker {worker_index}): {e}")
+
+if __name__ == "__main__":
+    if BOT_MODE == "webhook-multi":
+        # Akeh worker: dijaga supervisor (restart otomatis)
+        from supervisor import supervise
+        supervise()
+    else:
+        run_worker()
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+
+# ==========================================
+# ⚙️ KONFIGURASI STATUS
+# ==========================================
+# Saben proses bot nulis file status JSON (heartbeat) nang direktori iki.
+# Dashboard mung maca file-file iki, ora perlu nyambung menyang proses bot.
+BOT_STATUS_DIR = os.getenv("BOT_STATUS_DIR", ".bot_status")
+HEARTBEAT_INTERVAL = float(os.getenv("BOT_HEARTBEAT_INTERVAL", "5"))
+# Worker dianggep mati nek heartbeat-e luwih lawas tinimbang iki
+STALE_AFTER = HEARTBEAT_INTERVAL * 3
+
+
+def write_status_file(path, data):
+    """Nulis JSON kanthi atomik (tmp + rename) ben pamaca ora entuk file setengah."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class BotStatusReporter:
+    """Ngitung pesen/error/latensi siji worker lan nulis heartbeat menyang file status."""
+
+    def __init__(self, worker_name, mode, status_dir=BOT_STATUS_DIR):
+        self.worker_name = worker_name
+        self.mode = mode
+        self.path = os.path.join(status_dir, f"{worker_name}.json")
+        self.started_at = time.time()
+        self.messages_total = 0
+        self.errors_total = 0
+        self.latency_total = 0.0
+        self._recent = deque(maxlen=10000)  # timestamp pesen sing rampung
+        self._providers = {}
+
+    def record_message(self, latency, ok=True):
+        self.messages_total += 1
+        self.latency_total += latency
+        if not ok:
+            self.errors_total += 1
+        self._recent.append(time.time())
+
+    def add_provider(self, key, func):
+        """Data tambahan (contone snapshot metrik) sing dijupuk saben heartbeat."""
+        self._providers[key] = func
+
+    def snapshot(self):
+        now = time.time()
+        while self._recent and self._recent[0] < now - 60:
+            self._recent.popleft()
+        data = {
+            "worker": self.worker_name,
+            "pid": os.getpid(),
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "heartbeat_at": now,
+            "messages_total": self.messages_total,
+            "errors_total": self.errors_total,
+            "messages_per_min": len(self._recent),
+            "avg_latency": (self.latency_total / self.messages_total) if self.messages_total else 0.0,
+        }
+        for key, func in self._providers.items():
+            data[key] = func()
+        return data
+
+    def write(self):
+        write_status_file(self.path, self.snapshot())
+
+    async def run(self, interval=HEARTBEAT_INTERVAL):
+        while True:
+            try:
+                self.write()
+            except Exception as e:
+                print(f"❌ ERROR Status Heartbeat: {e}")
+            await asyncio.sleep(interval)
+
+
+def read_worker_statuses(status_dir=BOT_STATUS_DIR):
+    """Maca kabeh file status worker; saben entri ditambahi flag 'alive'."""
+    statuses = []
+    if not os.path.isdir(status_dir):
+        return statuses
+    now = time.time()
+    for name in sorted(os.listdir(status_dir)):
+        if not name.endswith(".json") or name.startswith("supervisor"):
+            continue
+        try:
+            with open(os.path.join(status_dir, name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        data["alive"] = now - data.get("heartbeat_at", 0) <= STALE_AFTER
+        statuses.append(data)
+    return statuses
+
+
+def read_supervisor_status(status_dir=BOT_STATUS_DIR):
+    try:
+        with open(os.path.join(status_dir, "supervisor.json"), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    data["alive"] = time.time() - data.get("heartbeat_at", 0) <= STALE_AFTER
+    return data
+
+
+def summarize_statuses(statuses):
+    """Ringkesan kanggo sidebar dashboard."""
+    alive = [s for s in statuses if s.get("alive")]
+    total_msgs = sum(s.get("messages_total", 0) for s in alive)
+    return {
+        "workers_alive": len(alive),
+        "workers_total": len(statuses),
+        "messages_per_min": sum(s.get("messages_per_min", 0) for s in alive),
+        "messages_total": total_msgs,
+        "errors_total": sum(s.get("errors_total", 0) for s in alive),
+        "avg_latency": (
+            sum(s.get("avg_latency", 0.0) * s.get("messages_total", 0) for s in alive) / total_msgs
+            if total_msgs else 0.0
+        ),
+    }
@@ -0,0 +1,98 @@
+"""Bus invalidasi antar-proses (bot, worker, dashboard) liwat SQLite lokal.
+
+Sing nulis (update status order, tambah produk/FAQ) nyathet `(topic, key)`
+nang tabel `changes`; saben proses nge-poll seq anyar (paling akeh sepisan
+saben CHANGE_BUS_POLL_INTERVAL) lan nyeluk callback sing langganan.
+"""
+import os
+import time
+import sqlite3
+import threading
+
+# ==========================================
+# ⚙️ KONFIGURASI CHANGE BUS
+# ==========================================
+CHANGE_BUS_PATH = os.getenv("CHANGE_BUS_PATH", "change_bus.sqlite3")
+CHANGE_BUS_POLL_INTERVAL = float(os.getenv("CHANGE_BUS_POLL_INTERVAL", "1.0"))
+# Baris lawas dibusak, proses sing telat poll luwih saka iki ngosongake cache-e kabeh
+CHANGE_BUS_RETENTION = float(os.getenv("CHANGE_BUS_RETENTION", "86400"))
+
+
+class ChangeBus:
+    def __init__(self, path=CHANGE_BUS_PATH, poll_interval=CHANGE_BUS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = {}  # topic -> [callback(key)]
+        self._next_poll = 0.0
+        try:
+            self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, key TEXT, ts REAL NOT NULL)"
+            )
+            # Wiwit saka posisi saiki: owah-owahan sadurunge proses iki urip ora relevan
+            self._last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        except sqlite3.Error as e:
+            # Tanpa bus, cache tetep aman amarga TTL; mung invalidasi antar-proses sing ilang
+            print(f"⚠️ Change bus ora aktif: {e}")
+            self._conn = None
+            self._last_seq = 0
+
+    def subscribe(self, topic, callback):
+        """callback(key) diceluk saben onok owah-owahan; key None = kabeh entri topic iku."""
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    def _dispatch(self, topic, key):
+        for callback in self._subscribers.get(topic, ()):
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"❌ ERROR Change bus ({topic}): {e}")
+
+    def publish(self, topic, key=None):
+        # Proses iki dhewe langsung di-invalidate, ora ngenteni poll
+        self._dispatch(topic, key)
+        if self._conn is None:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                cur = self._conn.execute(
+                    "INSERT INTO changes (topic, key, ts) VALUES (?, ?, ?)", (topic, key, now)
+                )
+                # Baris dhewe ora perlu di-dispatch maneh pas poll
+                if cur.lastrowid == self._last_seq + 1:
+                    self._last_seq = cur.lastrowid
+                self._conn.execute("DELETE FROM changes WHERE ts < ?", (now - CHANGE_BUS_RETENTION,))
+        except sqlite3.Error as e:
+            print(f"❌ ERROR Change bus (publish): {e}")
+
+    def poll(self, force=False):
+        """Njupuk owah-owahan saka proses liya. Murah: diwatesi poll_interval."""
+        if self._conn is None:
+            return 0
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return 0
+        self._next_poll = now + self.poll_interval
+        try:
+            with self._lock:
+                oldest = self._conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+                rows = self._conn.execute(
+                    "SELECT seq, topic, key FROM changes WHERE seq > ? ORDER BY seq", (self._last_seq,)
+                ).fetchall()
+                gap = oldest is not None and oldest > self._last_seq + 1 and self._last_seq > 0
+                if rows:
+                    self._last_seq = rows[-1][0]
+        except sqlite3.Error as e:
+            print(f"❌ ERROR Change bus (poll): {e}")
+            return 0
+
+        if gap:
+            # Owah-owahan wis kebusak sadurunge kewaca: invalidate kabeh topic
+            for topic in list(self._subscribers):
+                self._dispatch(topic, None)
+        for _, topic, key in rows:
+            self._dispatch(topic, key)
+        return len(rows)
@@ -0,0 +1,201 @@
+import os
+import asyncio
+from metrics import REGISTRY, incr
+from update_scheduler import MAX_PENDING_PER_CHAT
+
+# ==========================================
+# ⚙️ KONFIGURASI COALESCING
+# ==========================================
+# Customer kerep ngetik pecah-pecah ("kak", "mau tanya", "harga banner 2x1 berapa").
+# Pesen saka chat sing padha sing teka sajrone jendela sepi iki digabung dadi siji turn.
+# Opt-in: 0 = mati (saben pesen diproses dhewe, ora onok tambahan latensi).
+BOT_COALESCE_WINDOW = float(os.getenv("BOT_COALESCE_WINDOW", "0"))
+# Wates ngenteni total saka fragmen pertama (nek customer ngetik terus-terusan)
+BOT_COALESCE_MAX_WAIT = float(os.getenv("BOT_COALESCE_MAX_WAIT", "4.0"))
+# Wates global turn (agent) sing mlaku bareng
+BOT_MAX_CONCURRENT_TURNS = int(os.getenv("BOT_MAX_CONCURRENT_TURNS", "32"))
+
+
+class CommitGuard:
+    """Proxy pesen Telegram: pas bot ngirim balesan pertama, turn dianggep
+    "committed" lan ora bisa dibatalake fragmen anyar maneh.
+    """
+
+    def __init__(self, message, state):
+        self._message = message
+        self._state = state
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+    async def reply_text(self, *args, **kwargs):
+        self._state.committed = True
+        return await self._message.reply_text(*args, **kwargs)
+
+
+class _ChatState:
+    __slots__ = ("pending", "first_at", "last_at", "wake", "task", "running", "inflight", "committed")
+
+    def __init__(self):
+        self.pending = []        # [(text, message, context, command)]; command None = fragmen teks
+        self.first_at = None
+        self.last_at = 0.0
+        self.wake = asyncio.Event()
+        self.task = None         # runner per chat
+        self.running = None      # turn teks sing lagi mlaku
+        self.inflight = 0        # jumlah fragmen nang turn sing lagi mlaku
+        self.committed = False
+
+
+class MessageCoalescer:
+    """Nggabung pesen beruntun saka siji chat dadi siji turn.
+
+    - Fragmen diklumpukake nganti chat sepi sajrone `window` detik (paling suwe `max_wait`).
+    - Siji turn paling akeh `max_fragments` fragmen; fragmen sing teka nalika antrian
+      chat wis kebak dibuang (backpressure padha karo BOT_MAX_PENDING_PER_CHAT).
+    - Nek fragmen anyar teka pas turn lagi mlaku lan durung ngirim balesan apa-apa,
+      turn iku dibatalake lan diulang nganggo kabeh fragmen.
+    - Perintah (/reset, /chatadmin) mlebu antrian sing padha, dadi urutane tetep.
+    - Saben chat nduwe siji runner; semaphore global mbatesi turn sing mlaku bareng.
+
+    handler(chat_id, text, message, context) -> coroutine sing ngolah siji turn.
+    """
+
+    def __init__(self, handler, window=BOT_COALESCE_WINDOW, max_wait=BOT_COALESCE_MAX_WAIT,
+                 max_fragments=MAX_PENDING_PER_CHAT, max_concurrent=BOT_MAX_CONCURRENT_TURNS):
+        self.handler = handler
+        self.window = window
+        self.max_wait = max_wait
+        self.max_fragments = max_fragments
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._chats = {}
+
+    def _state(self, chat_id):
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = _ChatState()
+        return state
+
+    def _start(self, chat_id, state):
+        if state.task is None:
+            state.task = asyncio.get_running_loop().create_task(self._run_chat(chat_id, state))
+        else:
+            state.wake.set()
+
+    def _superseding(self, state):
+        return (
+            state.running is not None and not state.running.done() and not state.committed
+            and not any(item[3] is not None for item in state.pending)
+        )
+
+    def submit(self, chat_id, text, message, context=None):
+        """Nampa siji fragmen; langsung bali (ora ngenteni balesan). False nek dibuang."""
+        state = self._state(chat_id)
+        queued = len(state.pending) + (state.inflight if self._superseding(state) else 0)
+        if queued >= self.max_fragments:
+            # Backpressure: chat iki nge-flood, fragmen anyar dibuang
+            incr("bot.updates_dropped")
+            print(f"⚠️ [BOT] Chat {chat_id} kebanjiran pesen ({queued} antri), pesen dibuang.")
+            return False
+
+        now = asyncio.get_running_loop().time()
+        state.pending.append((text, message, context, None))
+        state.last_at = now
+        if state.first_at is None:
+            state.first_at = now
+        incr("coalesce.fragments")
+
+        if self._superseding(state):
+            # Jawaban durung metu: batalake, diulang karo fragmen anyar
+            state.running.cancel()
+        self._start(chat_id, state)
+        return True
+
+    def submit_command(self, chat_id, command):
+        """Perintah (coroutine factory tanpa argumen) dilakoni sakwise turn sing wis antri."""
+        state = self._state(chat_id)
+        state.pending.append((None, None, None, command))
+        self._start(chat_id, state)
+
+    async def _wait_quiet(self, state):
+        loop = asyncio.get_running_loop()
+        while True:
+            if len(state.pending) >= self.max_fragments:
+                return
+            if any(item[3] is not None for item in state.pending):
+                # Onok perintah antri: fragmen sakdurunge langsung diproses
+                return
+            until = min(state.last_at + self.window, state.first_at + self.max_wait)
+            delay = until - loop.time()
+            if delay <= 0:
+                return
+            state.wake.clear()
+            try:
+                await asyncio.wait_for(state.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _take_batch(self, state):
+        """Fragmen teks ing ngarep antrian (nganti perintah pertama, maks max_fragments)."""
+        size = 0
+        while (size < len(state.pending) and size < self.max_fragments
+               and state.pending[size][3] is None):
+            size += 1
+        batch, state.pending = state.pending[:size], state.pending[size:]
+        state.first_at = state.last_at if state.pending else None
+        return batch
+
+    async def _run_chat(self, chat_id, state):
+        try:
+            while state.pending:
+                command = state.pending[0][3]
+                if command is not None:
+                    state.pending.pop(0)
+                    try:
+                        await command()
+                    except Exception as e:
+                        print(f"❌ ERROR Coalesced command ({chat_id}): {e}")
+                    continue
+
+                await self._wait_quiet(state)
+                async with self._semaphore:
+                    # Fragmen sing teka pas ngenteni slot melu digabung
+                    batch = self._take_batch(state)
+                    text = "\n".join(t for t, _, _, _ in batch if t)
+                    _, message, context, _ = batch[-1]
+                    state.committed = False
+                    state.inflight = len(batch)
+                    incr("coalesce.turns")
+                    state.running = asyncio.get_running_loop().create_task(
+                        self.handler(chat_id, text, CommitGuard(message, state), context)
+                    )
+                    await asyncio.wait({state.running})
+
+                state.inflight = 0
+                if state.running.cancelled():
+                    # Disusul fragmen anyar: fragmen turn iki dibalekake menyang ngarep antrian
+                    incr("coalesce.superseded")
+                    state.pending = batch + state.pending
+                    state.first_at = state.last_at
+                elif state.running.exception() is not None:
+                    print(f"❌ ERROR Coalesced turn ({chat_id}): {state.running.exception()}")
+                state.running = None
+        finally:
+            state.task = None
+            if not state.pending and self._chats.get(chat_id) is state:
+                del self._chats[chat_id]
+
+    def __len__(self):
+        return len(self._chats)
+
+    @staticmethod
+    def stats():
+        fragments = REGISTRY.counter("coalesce.fragments")
+        turns = REGISTRY.counter("coalesce.turns")
+        return {
+            "fragments": fragments,
+            "turns": turns,
+            "superseded": REGISTRY.counter("coalesce.superseded"),
+            # Saben fragmen biyen dadi siji invocation agent
+            "invocations_saved": max(fragments - turns, 0),
+        }
@@ -2,6 +2,27 @@ import streamlit as st
 import datetime
 import os
 from supabase import create_client, Client
+from async_pool import run_db
+from metrics import span, incr
+from cache import TTLCache
+from change_bus import ChangeBus
+from product_index import ProductIndex, IndexResult, IndexNotReady
+from faq_engine import FAQIndex
+from order_writer import OrderWriter
+
+# Kolom sing ditampilake nang dhaptar order dashboard (id wajib kanggo cursor)
+ORDER_LIST_COLUMNS = "id, nomor_order, nama_pelanggan, status_order, total_biaya, detail_items, created_at"
+# Kolom minimal kanggo agregat analitik (analytics.py)
+ORDER_ANALYTICS_COLUMNS = "id, created_at, total_biaya, detail_items"
+# Kolom sing dicithak cek_status_order / fast path (ora perlu select *)
+ORDER_STATUS_COLUMNS = "nomor_order, status_order, updated_at"
+# Kode error "kolom ora onok" (Postgres / PostgREST): mung iki sing ngganti proyeksi dadi select *
+UNDEFINED_COLUMN_CODES = ("42703", "PGRST204")
+# Cache status order: diinvalidasi pas update/create (lan liwat ChangeBus antar-proses);
+# TTL mung jaring pengaman nek owah-owahan teka saka luar aplikasi iki
+ORDER_CACHE_SIZE = int(os.getenv("ORDER_CACHE_SIZE", "2048"))
+ORDER_CACHE_TTL = float(os.getenv("ORDER_CACHE_TTL", "600"))
+ORDER_CACHE_MISS_TTL = float(os.getenv("ORDER_CACHE_MISS_TTL", "30"))
 
 class DatabaseManager:
     """Mengelola semua interaksi dengan Database Supabase. 
@@ -22,6 +43,20 @@ class DatabaseManager:
             raise ConnectionError("Supabase URL/Key tidak ditemukan.")
 
         self.client: Client = create_client(url, key)
+        # Katalog produk di-cache nang memori, cari_produk ora perlu round-trip Supabase
+        self.product_index = ProductIndex(self._load_all_products)
+        # Nomer order bebas tabrakan + write-behind (spool SQLite lokal)
+        self.order_writer = OrderWriter(self.client)
+        # Read-through cache status order + bus invalidasi antar-proses (bot <-> dashboard)
+        self.order_cache = TTLCache(maxsize=ORDER_CACHE_SIZE, ttl=ORDER_CACHE_TTL)
+        self._order_generation = 0
+        self._status_columns = ORDER_STATUS_COLUMNS
+        self.changes = ChangeBus()
+        self.changes.subscribe("orders", self._invalidate_order)
+        self.changes.subscribe("products", lambda key: self.product_index.invalidate())
+        # FAQ dijawab langsung saka index BM25 nang memori sakdurunge agent
+        self.faq_index = FAQIndex(self._load_all_faq)
+        self.changes.subscribe("faq", lambda key: self.faq_index.invalidate())
 
     def _get_credentials(self):
         """Mencari kredensial dari os.environ dulu, lalu fallback ke st.secrets."""
@@ -40,9 +75,40 @@ class DatabaseManager:
 
     # --- (Method CRUD dan Admin di bawah ini tetap sama) ---
 
+    def _invalidate_order(self, nomor_order):
+        # Generasi munggah: fetch sing lagi mlaku ora oleh nyimpen data lawas menyang cache
+        self._order_generation += 1
+        if nomor_order is None:
+            self.order_cache.clear()
+        else:
+            self.order_cache.invalidate(nomor_order)
+
+    def _load_all_products(self):
+        return self.client.table('products').select("*").order('id', desc=True).execute().data
+
+    def _load_all_faq(self):
+        return self.client.table('faq').select("pertanyaan, jawaban").execute().data
+
+    def warmup_indexes(self):
+        """Katalog produk & FAQ dimuat nang background pas startup."""
+        self.product_index.warmup()
+        self.faq_index.warmup()
+
+    def answer_faq(self, text):
+        """Jawaban saka tabel faq nek cocok banget, utawa None. Ora round-trip DB."""
+        self.changes.poll()
+        return self.faq_index.answer(text)
+
     def search_products(self, query: str):
+        self.changes.poll()
+        try:
+            return IndexResult(self.product_index.search(query))
+        except IndexNotReady:
+            pass
+        except Exception as e:
+            print(f"❌ ERROR Product Index: {e}")
+        # Fallback menyang query remote nek index durung siap utawa gagal dimuat
         try:
-            print(f"🔍 [DB] Searching Product: {query}")
             if query.lower() in ["semua", "produk", "list", "menu"]:
                 result = self.client.table('products').select("*").limit(10).execute()
             else:
@@ -55,17 +121,18 @@ class DatabaseManager:
 
     def get_faq_summary(self):
         try:
-            print(f"🔍 [DB] Fetching FAQ...")
             return self.client.table('faq').select("pertanyaan, jawaban").limit(20).execute()
         except Exception as e:
             print(f"❌ ERROR DB (FAQ): {e}")
             return None
 
-    def create_order(self, nama, items, detail, total=0): 
-        now = datetime.datetime.now()
-        nomor_order = f"ORDER-{now.strftime('%y%m%d%H%M%S')}"
+    def create_order(self, nama, items, detail, total=0, idempotency_key=None): 
+        """Nggawe order anyar lan mbalekake nomer order (None nek gagal).
+
+        idempotency_key: nek dikirim maneh (retry), nomer order sing padha dibalekake
+        lan order ora digawe dobel.
+        """
         data = {
-            "nomor_order": nomor_order,
             "nama_pelanggan": nama,
             "status_order": "Menunggu Pembayaran",
             # [FIX]: Mbutuhake total sing dikirim saka Tool
@@ -73,30 +140,133 @@ class DatabaseManager:
             "detail_items": f"{items} ({detail})"
         }
         try:
-            self.client.table('orders').insert(data).execute()
-            return nomor_order
-        except Exception: return None
+            nomor_order = self.order_writer.submit(data, idempotency_key=idempotency_key)
+        except Exception as e:
+            print(f"❌ ERROR DB (Create Order): {e}")
+            return None
+        if nomor_order:
+            # Buang "ora ditemokake" sing mungkin wis ke-cache kanggo nomer iki
+            self.changes.publish("orders", nomor_order)
+        return nomor_order
 
     def check_order_status(self, nomor_order):
+        # Order sing isih antri nang spool durung tekan Supabase
+        pending = self.order_writer.get_pending(nomor_order)
+        if pending:
+            return IndexResult([pending])
+
+        self.changes.poll()
+        cached = self.order_cache.get(nomor_order)
+        if cached is not None:
+            incr("cache.order_status.hit")
+            return IndexResult(cached)
+        incr("cache.order_status.miss")
+
+        generation = self._order_generation
         try:
-            return self.client.table('orders').select("*").eq('nomor_order', nomor_order).execute()
-        except Exception: return None
+            res = self.client.table('orders').select(self._status_columns).eq('nomor_order', nomor_order).execute()
+        except Exception as e:
+            code = str(getattr(e, "code", "") or "")
+            if self._status_columns == "*" or code not in UNDEFINED_COLUMN_CODES:
+                # Timeout/jaringan lan sakpanunggalane: proyeksi ora diganti
+                print(f"❌ ERROR DB (Order Status): {e}")
+                return None
+            # Skema lawas tanpa kolom updated_at: bali menyang select * (mung sepisan)
+            print(f"⚠️ Proyeksi status order gagal ({e}), nganggo select *")
+            self._status_columns = "*"
+            return self.check_order_status(nomor_order)
+        if generation == self._order_generation:
+            # Order sing durung onok di-cache sedhela wae (bisa wae lagi mlebu saka jalur liya)
+            self.order_cache.set(nomor_order, res.data, ttl=None if res.data else ORDER_CACHE_MISS_TTL)
+        return res
 
     # -- Admin Methods --
     def get_all_orders(self):
         return self.client.table('orders').select("*").order('id', desc=True).execute()
 
+    def get_orders_page(self, limit=50, before_id=None, status=None, date_from=None, date_to=None,
+                        customer=None, columns=ORDER_LIST_COLUMNS):
+        """Njupuk siji kaca order (keyset pagination, urut id mudhun).
+
+        before_id: cursor saka kaca sadurunge (None = kaca pertama).
+        date_from/date_to: datetime.date, kalebu tanggal pungkasan.
+        Mbalekake (rows, next_cursor); next_cursor None nek wis kaca pungkasan.
+        """
+        q = self.client.table('orders').select(columns)
+        if before_id is not None:
+            q = q.lt('id', before_id)
+        if status:
+            q = q.eq('status_order', status)
+        if date_from:
+            q = q.gte('created_at', date_from.isoformat())
+        if date_to:
+            q = q.lt('created_at', (date_to + datetime.timedelta(days=1)).isoformat())
+        if customer:
+            q = q.ilike('nama_pelanggan', f'%{customer}%')
+
+        # Jupuk siji luwih kanggo ngerti isih onok kaca sabanjure apa ora
+        rows = q.order('id', desc=True).limit(limit + 1).execute().data or []
+        next_cursor = rows[limit - 1]['id'] if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def get_orders_since(self, after_id=0, limit=1000, columns=ORDER_ANALYTICS_COLUMNS):
+        """Order kanthi id > after_id, urut id munggah (kanggo agregat inkremental)."""
+        return self.client.table('orders').select(columns).gt('id', after_id).order('id').limit(limit).execute().data
+
+    def count_orders_by_status(self, statuses):
+        """Jumlah order saben status, diitung nang server (ora narik baris)."""
+        counts = {}
+        for status in statuses:
+            res = self.client.table('orders').select('id', count='exact').eq('status_order', status).limit(1).execute()
+            counts[status] = res.count or 0
+        return counts
+
     def update_order_status(self, nomor_order, status_baru):
-        return self.client.table('orders').update({"status_order": status_baru}).eq("nomor_order", nomor_order).execute()
+        res = self.client.table('orders').update({"status_order": status_baru}).eq("nomor_order", nomor_order).execute()
+        self.changes.publish("orders", nomor_order)
+        return res
 
     def add_product(self, data):
-        return self.client.table('products').insert(data).execute()
+        res = self.client.table('products').insert(data).execute()
+        self.changes.publish("products")
+        return res
 
     def add_faq(self, data):
-        return self.client.table('faq').insert(data).execute()
+        res = self.client.table('faq').insert(data).execute()
+        self.changes.publish("faq")
+        return res
 
     def get_all_products(self):
         return self.client.table('products').select("*").order('id', desc=True).execute()
 
     def get_all_faq(self):
-        return self.client.table('faq').select("*").order('id', desc=True).execute()
\ No newline at end of file
+        return self.client.table('faq').select("*").order('id', desc=True).execute()
+
+
+class AsyncDatabaseManager:
+    """Wrapper async kanggo jalur bot. Kabeh panggilan supabase-py sinkron
+    dilakoni nang pool DB sing diwatesi (ndelok async_pool.py).
+    """
+
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    async def search_products(self, query: str):
+        async with span("db.search_products"):
+            return await run_db(self.db.search_products, query)
+
+    async def answer_faq(self, text):
+        async with span("db.answer_faq"):
+            return await run_db(self.db.answer_faq, text)
+
+    async def get_faq_summary(self):
+        async with span("db.get_faq_summary"):
+            return await run_db(self.db.get_faq_summary)
+
+    async def create_order(self, nama, items, detail, total=0, idempotency_key=None):
+        async with span("db.create_order"):
+            return await run_db(self.db.create_order, nama, items, detail, total, idempotency_key)
+
+    async def check_order_status(self, nomor_order):
+        async with span("db.check_order_status"):
+            return await run_db(self.db.check_order_status, nomor_order)
@@ -0,0 +1,87 @@
+import os
+import asyncio
+from async_pool import run_embed
+from metrics import incr
+
+# ==========================================
+# ⚙️ KONFIGURASI MICRO-BATCH
+# ==========================================
+# Pitakon sing teka bareng nang jendela iki digabung dadi siji forward pass
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+
+
+class BatchingEmbedder:
+    """Ngumpulake panggilan embed() sing bareng-bareng (sak jendela cilik, maks
+    max_batch) lan nglakoni siji embed_documents batch nang pool embedding.
+    Saben caller entuk vektore dhewe.
+
+    Batch dilakoni siji-siji: sak suwene siji batch mlaku, pitakon anyar ngumpul
+    dadi batch sabanjure sing luwih gedhe, dadi throughput munggah karo beban.
+    """
+
+    def __init__(self, embed_batch_fn, window_ms=EMBED_BATCH_WINDOW_MS, max_batch=EMBED_MAX_BATCH):
+        self.embed_batch_fn = embed_batch_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = None
+        self._loop = None
+        self._task = None
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._worker())
+
+    async def embed(self, text):
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Enteni sedhela ben pitakon liyane sing meh bareng melu mlebu batch
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            live = [(text, fut) for text, fut in batch if not fut.done()]
+            if not live:
+                continue
+            # Teks sing padha mung di-embed sepisan
+            texts = list(dict.fromkeys(text for text, _ in live))
+            try:
+                vectors = await run_embed(self.embed_batch_fn, texts)
+                by_text = dict(zip(texts, vectors))
+                for text, fut in live:
+                    if not fut.done():
+                        fut.set_result(by_text[text])
+            except Exception as e:
+                for _, fut in live:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+            self.batches += 1
+            self.items += len(live)
+            self.max_batch_seen = max(self.max_batch_seen, len(live))
+            incr("embed.batches")
+            incr("embed.items", len(live))
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            # Rasio isi batch (0-1), dudu latensi: ora mlebu histogram metrics.py
+            "avg_batch_fill": (self.items / (self.batches * self.max_batch)) if self.batches else 0.0,
+        }
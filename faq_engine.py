@@ -0,0 +1,199 @@
+import os
+import math
+import time
+import threading
+from collections import Counter
+from metrics import incr
+from product_index import tokenize
+
+# ==========================================
+# ⚙️ KONFIGURASI FAQ
+# ==========================================
+# Pitakon sing wis onok nang tabel faq dijawab langsung (BM25 nang memori),
+# tanpa agent/LLM. Mung sing yakin (confidence dhuwur) sing dijawab.
+FAQ_INDEX_TTL = float(os.getenv("FAQ_INDEX_TTL", "600"))
+FAQ_MIN_CONFIDENCE = float(os.getenv("FAQ_MIN_CONFIDENCE", "0.7"))
+# Juara loro sing jawabane beda lan skore cedhak = ambigu, diterusake agent
+FAQ_MIN_MARGIN = float(os.getenv("FAQ_MIN_MARGIN", "0.15"))
+FAQ_MAX_WORDS = int(os.getenv("FAQ_MAX_WORDS", "20"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Tembung sapaan/pengisi sing ora mbedakake pitakon siji karo liyane
+FAQ_STOPWORDS = {
+    "kak", "ka", "min", "mas", "mbak", "gan", "sis", "halo", "hai", "permisi", "ya", "yo",
+    "dong", "sih", "nih", "deh", "kah", "mau", "tanya", "takon", "yang", "sing", "di",
+    "nang", "ning", "ke", "dan", "atau", "itu", "ini", "iki", "iku", "apakah", "ga", "gak", "nggak",
+}
+
+
+def _terms(text):
+    return [t for t in tokenize(text) if t not in FAQ_STOPWORDS]
+
+
+class _FAQSnapshot:
+    """Isi index sing ora tau diowah sakwise dibangun. refresh() ngganti sak-objek,
+    dadi match() nang thread liya mesthi maca data sing konsisten tanpa lock.
+    """
+
+    __slots__ = ("entries", "postings", "idf", "doc_len", "avg_len", "self_scores")
+
+    def __init__(self, entries=(), postings=None, idf=None, doc_len=(), avg_len=1.0):
+        self.entries = list(entries)
+        self.postings = postings or {}   # term -> [(entry_idx, tf)]
+        self.idf = idf or {}
+        self.doc_len = list(doc_len)
+        self.avg_len = avg_len or 1.0
+        self.self_scores = []
+
+    def idf_of(self, term):
+        # Tembung sing ora onok nang FAQ babar pisan dianggep paling langka
+        return self.idf.get(term, math.log(1 + (len(self.entries) + 0.5) / 0.5))
+
+    def scores(self, terms):
+        """BM25 saben entri lan bobot idf tembung query sing ketemu nang entri iku."""
+        scores, matched = {}, {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for idx, tf in self.postings[term]:
+                norm = 1 - BM25_B + BM25_B * self.doc_len[idx] / self.avg_len
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                matched[idx] = matched.get(idx, 0.0) + idf
+        return scores, matched
+
+
+class FAQIndex:
+    """Index BM25 saka pasangan pertanyaan/jawaban tabel faq.
+
+    Dimuat sepisan, di-refresh miturut TTL utawa pas invalidate() (contone
+    sakwise add_faq). Ora tau ngalangi event loop: nek durung dimuat, match()
+    mbalekake None lan loading mlaku nang background.
+    """
+
+    def __init__(self, loader, ttl=FAQ_INDEX_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        # Mundhak saben invalidate(); loading sing diwiwiti sakdurunge ora dianggep seger
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # --- Loading ---
+    def refresh(self):
+        """Muat ulang kabeh FAQ saka database lan mbangun index anyar.
+
+        Mbalekake False nek onok invalidate() pas loading (index isih kadaluwarsa).
+        """
+        with self._lock:
+            generation = self._generation
+        entries = [
+            e for e in (self.loader() or [])
+            if (e.get("pertanyaan") or "").strip() and (e.get("jawaban") or "").strip()
+        ]
+        docs = [Counter(_terms(e["pertanyaan"])) for e in entries]
+        postings = {}
+        for idx, doc in enumerate(docs):
+            for term, tf in doc.items():
+                postings.setdefault(term, []).append((idx, tf))
+        n = len(docs)
+        idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in postings.items()}
+        doc_len = [sum(doc.values()) for doc in docs]
+        snapshot = _FAQSnapshot(entries, postings, idf, doc_len, (sum(doc_len) / n) if n else 1.0)
+        # Skor maksimal saben FAQ (pitakon persis padha) kanggo normalisasi confidence
+        snapshot.self_scores = [snapshot.scores(set(doc))[0].get(idx, 0.0) for idx, doc in enumerate(docs)]
+
+        with self._lock:
+            self._snapshot = snapshot
+            fresh = generation == self._generation
+            if fresh:
+                self._loaded_at = time.monotonic()
+        return fresh
+
+    def invalidate(self):
+        """Tandhani index kadaluwarsa lan langsung muat ulang nang background."""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = 0.0
+            in_use = self._snapshot is not None
+        if in_use:
+            self._ensure_fresh()
+
+    def _refresh_background(self):
+        try:
+            # Diulang nek onok invalidate() maneh pas loading (paling akeh 3x)
+            for _ in range(3):
+                if self.refresh():
+                    break
+        except Exception as e:
+            print(f"❌ ERROR FAQ Index Refresh: {e}")
+        finally:
+            self._refreshing = False
+
+    def _ensure_fresh(self):
+        """Mbalekake snapshot saiki; nek wis kadaluwarsa, refresh diwiwiti nang background."""
+        with self._lock:
+            snapshot = self._snapshot
+            stale = self._loaded_at == 0.0 or time.monotonic() - self._loaded_at > self.ttl
+            start = stale and not self._refreshing
+            if start:
+                self._refreshing = True
+        if start:
+            threading.Thread(target=self._refresh_background, daemon=True).start()
+        return snapshot
+
+    def warmup(self):
+        """Miwiti loading nang background (contone pas bot start)."""
+        self._ensure_fresh()
+
+    # --- Matching ---
+    def match(self, text):
+        """Mbalekake (entri, confidence) FAQ sing paling cocok, utawa None."""
+        snapshot = self._ensure_fresh()
+        if snapshot is None or not snapshot.entries:
+            return None
+        if len((text or "").split()) > FAQ_MAX_WORDS:
+            return None
+        terms = set(_terms(text))
+        if not terms:
+            return None
+
+        scores, matched = snapshot.scores(terms)
+        query_weight = sum(snapshot.idf_of(t) for t in terms)
+        ranked = []
+        for idx, score in scores.items():
+            # "Precision": sepira akeh pitakon FAQ sing ketutup; "recall": sepira akeh
+            # query sing dijelasake FAQ. Confidence = rata-rata harmonis keloro-lorone.
+            precision = score / snapshot.self_scores[idx] if snapshot.self_scores[idx] else 0.0
+            recall = matched[idx] / query_weight
+            if precision and recall:
+                ranked.append((2 * precision * recall / (precision + recall), idx))
+        if not ranked:
+            return None
+        ranked.sort(reverse=True)
+
+        confidence, best = ranked[0]
+        answer = snapshot.entries[best]["jawaban"].strip()
+        for other_conf, other in ranked[1:]:
+            if snapshot.entries[other]["jawaban"].strip() == answer:
+                continue
+            if confidence - other_conf < FAQ_MIN_MARGIN:
+                return None
+            break
+        return snapshot.entries[best], confidence
+
+    def answer(self, text):
+        """Jawaban FAQ nek confidence >= FAQ_MIN_CONFIDENCE, utawa None (terus menyang agent)."""
+        result = self.match(text)
+        if result is None or result[1] < FAQ_MIN_CONFIDENCE:
+            incr("faq.miss")
+            return None
+        incr("faq.hit")
+        return result[0]["jawaban"].strip()
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot.entries) if snapshot is not None else 0
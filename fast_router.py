@@ -0,0 +1,119 @@
+import re
+import time
+import asyncio
+from metrics import REGISTRY, incr, span
+from shop_info import SHOP_ADDRESS, SHOP_HOURS, SHOP_BANK_ACCOUNT
+
+# ==========================================
+# ⚡ FAST-PATH ROUTER
+# ==========================================
+# Pesen cekak sing jelas maksude (cek order, jam buka, alamat, rekening) dijawab
+# langsung nganggo template, tanpa round-trip LLM. Liyane diterusake menyang agent.
+
+ORDER_PATTERN = re.compile(r"\bORDER-\d{12}(?:-\d{4})?\b", re.IGNORECASE)
+# Mung pesen cekak sing dijawab fast-path; pesen dawa biasane campur maksud liya
+MAX_WORDS = 8
+
+INTENT_KEYWORDS = {
+    "jam_buka": (
+        "jam buka", "buka jam", "jam operasional", "jam kerja", "tutup jam", "buka sampai",
+        "buka sampe", "bukak jam", "jam piro", "buka jam berapa", "jam brp", "buka gak", "buka ga",
+    ),
+    "alamat": (
+        "alamat", "lokasi", "dimana tokonya", "di mana tokonya", "toko dimana", "tokone nang endi",
+        "nang endi", "share loc", "sharelok", "maps",
+    ),
+    "rekening": (
+        "rekening", "no rek", "norek", "nomor rek", "transfer kemana", "transfer ke mana",
+        "tf kemana", "tf ke mana", "bayar kemana", "bayar ke mana",
+    ),
+}
+
+# Nek ana tembung iki, pesen-e butuh agent (regane, pesenan, konsultasi)
+AGENT_WORDS = ("harga", "rego", "pesan", "cetak", "bahan", "ukuran", "estimasi", "berapa lama")
+
+TEMPLATES = {
+    "jam_buka": f"Spectrum buka {SHOP_HOURS} Kak 🙌",
+    "alamat": f"Alamat kami nang {SHOP_ADDRESS} ya Kak 📍",
+    "rekening": f"Pembayaran bisa transfer menyang {SHOP_BANK_ACCOUNT} ya Kak 🏦",
+}
+
+
+def classify(text):
+    """Mbalekake (list intent, nomor_order) utawa None nek kudu diterusake menyang agent."""
+    normalized = " ".join((text or "").lower().split())
+    if not normalized or len(normalized.split()) > MAX_WORDS:
+        return None
+
+    order_match = ORDER_PATTERN.search(text)
+    if order_match:
+        return ["cek_order"], order_match.group(0).upper()
+
+    if any(w in normalized for w in AGENT_WORDS):
+        return None
+    intents = [name for name, keywords in INTENT_KEYWORDS.items() if any(k in normalized for k in keywords)]
+    if not intents:
+        return None
+    return intents, None
+
+
+class FastPathRouter:
+    """Tahap sakdurunge agent: jawab intent gampang nganggo template lan nyathet hit rate."""
+
+    def __init__(self, async_db):
+        self.async_db = async_db
+
+    async def _order_reply(self, nomor_order):
+        try:
+            res = await self.async_db.check_order_status(nomor_order)
+        except asyncio.TimeoutError:
+            return None
+        if res is None:
+            # DB error: ben agent sing ngurus (bisa njaluk ngenteni / nyoba maneh)
+            return None
+        if not res.data:
+            return f"Maaf Kak, Nomor Order '{nomor_order}' ora ditemokake. Coba dicek maneh ya nomere 🙏"
+        o = res.data[0]
+        return (
+            f"Status Order {o['nomor_order']}: {o['status_order']} Kak.\n"
+            f"(Update terakhir: {o.get('updated_at', '-')})"
+        )
+
+    async def route(self, text):
+        """Mbalekake jawaban template, utawa None nek pesen kudu diproses agent."""
+        t0 = time.perf_counter()
+        result = classify(text)
+        reply = None
+        if result is not None:
+            intents, nomor_order = result
+            async with span("bot.fastpath"):
+                if nomor_order:
+                    reply = await self._order_reply(nomor_order)
+                else:
+                    reply = "\n".join(TEMPLATES[i] for i in intents)
+
+        if reply is None:
+            incr("fastpath.miss")
+            return None
+
+        incr("fastpath.hit")
+        incr(f"fastpath.hit.{intents[0]}")
+        # Perkiraan wektu sing dihemat: rata-rata durasi agent dikurangi durasi fast-path
+        agent_hist = REGISTRY.histogram("bot.agent")
+        if agent_hist is not None and agent_hist.count:
+            saved = agent_hist.total / agent_hist.count - (time.perf_counter() - t0)
+            incr("fastpath.saved_seconds", max(saved, 0.0))
+        return reply
+
+    @staticmethod
+    def stats():
+        hits = REGISTRY.counter("fastpath.hit")
+        misses = REGISTRY.counter("fastpath.miss")
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "llm_runs_saved": hits,
+            "saved_seconds": REGISTRY.counter("fastpath.saved_seconds"),
+        }
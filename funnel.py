@@ -0,0 +1,59 @@
+"""Funnel percakapan bot (chat -> agent -> checkout), dicathet nang SQLite lokal.
+
+Dipisah saka analytics.py ben proses bot ora perlu ngimpor pandas.
+"""
+import os
+import sqlite3
+import datetime
+import threading
+
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "analytics.sqlite3")
+FUNNEL_EVENTS = ["chat", "fastpath", "faq", "agent", "checkout"]
+
+
+class FunnelRecorder:
+    """Nyathet chat unik per dina per tahap. Saben (chat, tahap) mung ditulis
+    sepisan sedina; sing wis tau dicathet ditahan nang memori.
+    """
+
+    def __init__(self, path=ANALYTICS_DB_PATH):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._seen_day = None
+        try:
+            self._conn = connect_funnel_db(path)
+        except sqlite3.Error as e:
+            print(f"⚠️ Funnel recorder ora aktif: {e}")
+            self._conn = None
+
+    def record(self, chat_id, event):
+        if self._conn is None:
+            return
+        day = datetime.date.today().isoformat()
+        key = (str(chat_id), event)
+        with self._lock:
+            if day != self._seen_day:
+                self._seen.clear()
+                self._seen_day = day
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO funnel_events (day, event, chat_id) VALUES (?, ?, ?)",
+                    (day, event, key[0]),
+                )
+            except sqlite3.Error as e:
+                print(f"❌ ERROR Funnel: {e}")
+
+
+def connect_funnel_db(path):
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS funnel_events ("
+        " day TEXT NOT NULL, event TEXT NOT NULL, chat_id TEXT NOT NULL,"
+        " PRIMARY KEY (day, event, chat_id)) WITHOUT ROWID"
+    )
+    return conn
@@ -0,0 +1,215 @@
+"""Pipeline ingest basis pengetahuan (spectrum_knowledge) sing inkremental.
+
+1. Maca dokumen sumber (.md/.txt) saka KB_SOURCE_DIR.
+2. Mecah dadi chunk (per paragraf, maks KB_CHUNK_CHARS karakter).
+3. Embed MUNG chunk anyar/berubah (dideteksi saka hash konten), batch.
+4. Nulis index lokal (matrix float32 memory-mapped + meta.json) kanggo
+   konsultasi_cetak, lan opsional nyamakake koleksi Qdrant karo index lokal.
+
+    python knowledge_ingest.py                 # index lokal wae
+    python knowledge_ingest.py --qdrant        # plus upsert chunk sing durung onok nang Qdrant Cloud
+    python knowledge_ingest.py --qdrant --prune  # plus busak point Qdrant sing ora onok nang lokal
+"""
+import os
+import time
+import uuid
+import hashlib
+import argparse
+from vector_index import KB_INDEX_DIR, VECTORS_FILE, read_index_meta, write_index
+
+# ==========================================
+# ⚙️ KONFIGURASI INGEST
+# ==========================================
+KB_SOURCE_DIR = os.getenv("KB_SOURCE_DIR", "knowledge")
+KB_CHUNK_CHARS = int(os.getenv("KB_CHUNK_CHARS", "800"))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "100"))
+EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH", "64"))
+# WAJIB: padha karo model nang tools.py
+EMBED_MODEL = "all-MiniLM-L6-v2"
+SOURCE_EXTENSIONS = (".md", ".txt")
+QDRANT_SYNC_BATCH = 256
+_POINT_NAMESPACE = uuid.UUID("5b0c7a3e-6f0e-4d55-9f7b-2f4e1c6a9d10")
+
+
+def iter_documents(source_dir=KB_SOURCE_DIR):
+    """Yield (path relatif, teks) kanggo saben dokumen sumber."""
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            if name.lower().endswith(SOURCE_EXTENSIONS):
+                path = os.path.join(root, name)
+                with open(path, encoding="utf-8") as f:
+                    yield os.path.relpath(path, source_dir), f.read()
+
+
+def chunk_text(text, max_chars=KB_CHUNK_CHARS, overlap=KB_CHUNK_OVERLAP):
+    """Gabungake paragraf nganti max_chars; paragraf sing kedawan dipecah kanthi overlap."""
+    chunks = []
+    current = ""
+    for para in (p.strip() for p in text.split("\n\n")):
+        if not para:
+            continue
+        if len(para) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            step = max(1, max_chars - overlap)
+            chunks.extend(para[i:i + max_chars] for i in range(0, len(para), step))
+            continue
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def content_hash(text):
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def point_id(chunk_hash):
+    """ID point Qdrant sing stabil saka hash konten."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, chunk_hash))
+
+
+def _load_existing_vectors(index_dir):
+    import numpy as np
+
+    meta = read_index_meta(index_dir)
+    if not meta or not meta.get("count") or meta.get("model") != EMBED_MODEL:
+        return {}
+    matrix = np.fromfile(os.path.join(index_dir, VECTORS_FILE), dtype=np.float32)
+    matrix = matrix.reshape(meta["count"], meta["dim"])
+    return {c["hash"]: matrix[i] for i, c in enumerate(meta["chunks"])}
+
+
+def ingest(source_dir=KB_SOURCE_DIR, index_dir=KB_INDEX_DIR, sync_qdrant=False, prune=False):
+    if not os.path.isdir(source_dir):
+        raise FileNotFoundError(f"Folder sumber KB '{source_dir}' ora onok, ingest dibatalake.")
+    import numpy as np
+    import tools
+
+    t0 = time.perf_counter()
+    existing = _load_existing_vectors(index_dir)
+
+    chunks = []
+    seen = set()
+    for source, text in iter_documents(source_dir):
+        for content in chunk_text(text):
+            h = content_hash(content)
+            if h not in seen:
+                seen.add(h)
+                chunks.append({"hash": h, "source": source, "content": content})
+
+    if not chunks:
+        # Index lokal lan koleksi Qdrant ora oleh dikosongake gara-gara sumber kosong
+        raise ValueError(f"Folder sumber KB '{source_dir}' ora ngasilake chunk babar pisan, ingest dibatalake.")
+
+    new_chunks = [c for c in chunks if c["hash"] not in existing]
+    removed = [h for h in existing if h not in seen]
+
+    # Embed mung chunk anyar, sak batch
+    vectors = dict(existing)
+    if new_chunks:
+        embeddings = tools.get_embeddings()
+        for i in range(0, len(new_chunks), EMBED_BATCH_SIZE):
+            batch = new_chunks[i:i + EMBED_BATCH_SIZE]
+            embedded = np.asarray(embeddings.embed_documents([c["content"] for c in batch]), dtype=np.float32)
+            embedded /= np.linalg.norm(embedded, axis=1, keepdims=True) + 1e-9
+            for c, v in zip(batch, embedded):
+                vectors[c["hash"]] = v
+
+    matrix = np.stack([vectors[c["hash"]] for c in chunks])
+    write_index(index_dir, matrix, chunks, EMBED_MODEL)
+
+    if sync_qdrant:
+        # Dibandingke karo isi koleksi, dudu delta lokal: Qdrant sing ketinggalan
+        # (utawa isih nduwe point saka upload lawas) tetep dibenakake
+        upserted, deleted = _sync_qdrant(chunks, vectors, prune=prune)
+        print(f"☁️ Qdrant sinkron: {upserted} point di-upsert, {deleted} point dibusak")
+
+    tools.invalidate_knowledge_cache()
+    print(
+        f"🧠 Ingest rampung nang {time.perf_counter() - t0:.1f}s: {len(chunks)} chunk "
+        f"({len(new_chunks)} anyar/berubah, {len(removed)} dibusak, "
+        f"{len(chunks) - len(new_chunks)} dienggo maneh)"
+    )
+    return {"total": len(chunks), "added": len(new_chunks), "removed": len(removed)}
+
+
+def _remote_point_ids(client, collection):
+    """Kabeh ID point sing saiki onok nang koleksi (tanpa payload/vektor)."""
+    ids, offset = set(), None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, limit=QDRANT_SYNC_BATCH, offset=offset,
+            with_payload=False, with_vectors=False,
+        )
+        ids.update(str(p.id) for p in points)
+        if offset is None:
+            return ids
+
+
+def _sync_qdrant(chunks, vectors, prune=False):
+    """Nyamakake koleksi Qdrant karo index lokal: point sing durung onok di-upsert.
+    Point sing ora onok nang lokal (kalebu ID lawas non-hash) mung dibusak nek
+    prune=True; liyane mung dicithak. Mbalekake (jumlah upsert, jumlah dibusak).
+    """
+    from qdrant_client.models import Distance, PointIdsList, PointStruct, VectorParams
+    import tools
+
+    client = tools.get_qdrant_client()
+    collection = tools.KB_COLLECTION
+    if not client.collection_exists(collection):
+        if not chunks:
+            return 0, 0
+        dim = len(vectors[chunks[0]["hash"]])
+        client.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        )
+        print(f"🆕 Koleksi Qdrant '{collection}' digawe (dim {dim}, cosine)")
+
+    remote = _remote_point_ids(client, collection)
+    local = {point_id(c["hash"]): c for c in chunks}
+    missing = [c for pid, c in local.items() if pid not in remote]
+    stale = [pid for pid in remote if pid not in local]
+
+    for i in range(0, len(missing), QDRANT_SYNC_BATCH):
+        client.upsert(
+            collection_name=collection,
+            points=[
+                PointStruct(id=point_id(c["hash"]), vector=vectors[c["hash"]].tolist(),
+                            payload={"content": c["content"], "source": c["source"], "hash": c["hash"]})
+                for c in missing[i:i + QDRANT_SYNC_BATCH]
+            ],
+        )
+    if stale and not prune:
+        print(
+            f"⚠️ {len(stale)} point Qdrant ora onok nang index lokal (contone {', '.join(stale[:5])}). "
+            "Ora dibusak; jalanake maneh nganggo --prune nek pancen kudu dibusak."
+        )
+        return len(missing), 0
+    for i in range(0, len(stale), QDRANT_SYNC_BATCH):
+        client.delete(
+            collection_name=collection,
+            points_selector=PointIdsList(points=stale[i:i + QDRANT_SYNC_BATCH]),
+        )
+    return len(missing), len(stale)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest basis pengetahuan SpectrumBot")
+    parser.add_argument("--source", default=KB_SOURCE_DIR)
+    parser.add_argument("--index", default=KB_INDEX_DIR)
+    parser.add_argument("--qdrant", action="store_true", help="Upsert chunk sing durung onok menyang koleksi Qdrant")
+    parser.add_argument("--prune", action="store_true",
+                        help="Karo --qdrant: busak point Qdrant sing ora onok nang index lokal")
+    args = parser.parse_args()
+    try:
+        ingest(args.source, args.index, sync_qdrant=args.qdrant, prune=args.prune)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
@@ -1,42 +1,21 @@
 import streamlit as st
 import os
+import time
+import hashlib
+import threading
 from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI, HarmBlockThreshold, HarmCategory
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.callbacks import BaseCallbackHandler
+import tools
 from tools import bot_tools, set_global_db 
 from langchain.agents import initialize_agent, AgentType
+from metrics import record_span
+from model_router import ModelRouter, RoutedChatModel
+from shop_info import SHOP_ADDRESS, SHOP_HOURS, SHOP_BANK_ACCOUNT
 
-class LLMService:
-    """Mengelola Model AI (Groq/Gemini) dan Agent."""
-
-    def __init__(self, model_choice):
-        self.model_choice = model_choice
-        self.google_key = os.getenv("GOOGLE_API_KEY")
-        self.groq_key = os.getenv("GROQ_API_KEY")
-
-    # def _get_llm(self):
-    #     return ChatGroq(
-    #         temperature=0, 
-    #         model_name="meta-llama/llama-4-scout-17b-16e-instruct",
-    #         groq_api_key=self.groq_key
-    #     )
-
-    def _get_llm(self):
-        return ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0,
-            google_api_key=self.google_key
-        )
-
-    def get_executor(self, db_manager_instance): 
-        
-        set_global_db(db_manager_instance) 
-
-        llm = self._get_llm()
-        
-        prompt = ChatPromptTemplate.from_messages([
-        ("system", """
+SYSTEM_PROMPT = f"""
         Kamu adalah 'SpectrumBot', Lead Qualifier di Spectrum Digital Printing Surabaya.
 
          TUGAS UTAMAMU:
@@ -61,14 +40,175 @@ class LLMService:
          - JANGAN PERNAH MENGARANG! Jika tool tidak memberikan jawaban, katakan: "Waduh Kak, kalau soal itu saya harus tanyakan ke tim teknis dulu ya."
 
          INFO TOKO (STATIS):
-         - Alamat: Ruko Manyar Garden Regency 27, Surabaya.
-         - Jam Buka: 06.30 - 24.00 WIB (Setiap Hari).
-         - Rekening: BCA 1234567890 a.n Spectrum Digital Printing.
-        """),
+         - Alamat: {SHOP_ADDRESS}.
+         - Jam Buka: {SHOP_HOURS}.
+         - Rekening: {SHOP_BANK_ACCOUNT}.
+        """
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Callback LangChain: ngukur saben panggilan LLM lan saben tool menyang metrics.py."""
+
+    # Dilakoni langsung nang coroutine sing nyeluk, ora dipindhah menyang thread
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+
+    def _start(self, run_id, name):
+        self._starts[run_id] = (name, time.perf_counter())
+
+    def _end(self, run_id, error=None):
+        entry = self._starts.pop(run_id, None)
+        if entry is not None:
+            name, t0 = entry
+            record_span(name, t0, time.perf_counter() - t0, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm.call")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm.call")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool.{(serialized or {}).get('name', 'unknown')}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, type(error).__name__)
+
+METRICS_CALLBACK = MetricsCallbackHandler()
+
+# Registry executor sing urip sak suwene proses: model_choice -> (fingerprint, executor)
+# AgentExecutor ora nyimpen state per-chat, dadi aman dienggo bareng akeh chat.
+# Tools maca DB saka global (tools.set_global_db), dadi siji proses = siji DatabaseManager;
+# executor ora gumantung instance DB, mula DB ora melu dadi key.
+_EXECUTOR_REGISTRY = {}
+# Router per model_choice, dienggo bareng kabeh LLMService (lan executor) nang proses iki
+_ROUTERS = {}
+_REGISTRY_LOCK = threading.Lock()
+
+class LLMService:
+    """Mengelola Model AI (Groq/Gemini) dan Agent."""
+
+    def __init__(self, model_choice, system_prompt=None, tools=None):
+        self.model_choice = model_choice
+        self.google_key = os.getenv("GOOGLE_API_KEY")
+        self.groq_key = os.getenv("GROQ_API_KEY")
+        self.system_prompt = system_prompt or SYSTEM_PROMPT
+        self.tools = list(tools or bot_tools)
+        self._fingerprint = self._compute_fingerprint()
+        # Router urip sak suwene service, statistik latensi tetep sanajan executor dibangun ulang
+        self.router = None
+
+    def _get_backends(self):
+        """Backend sing kadaftar (mung sing onok API key-e), urut miturut model_choice.
+
+        Retry internal SDK dicilikake: fallback lan hedging diurus ModelRouter.
+        """
+        backends = []
+        if self.google_key:
+            backends.append(("gemini", ChatGoogleGenerativeAI(
+                model="gemini-2.5-flash",
+                temperature=0,
+                google_api_key=self.google_key,
+                max_retries=1,
+            )))
+        if self.groq_key:
+            backends.append(("groq", ChatGroq(
+                temperature=0,
+                model_name="meta-llama/llama-4-scout-17b-16e-instruct",
+                groq_api_key=self.groq_key,
+                max_retries=1,
+            )))
+        # model_choice mung nemtokake preferensi awal; sakwise iku latensi sing milih
+        choice = (self.model_choice or "").lower()
+        backends.sort(key=lambda b: b[0] not in choice)
+        return backends
+
+    def _get_llm(self):
+        if self.router is None:
+            self.router = _ROUTERS.get(self.model_choice)
+        if self.router is None:
+            backends = self._get_backends()
+            if not backends:
+                # Ora onok key babar pisan: tetep Gemini, error-e metu pas panggilan pertama
+                return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, google_api_key=self.google_key)
+            self.router = _ROUTERS[self.model_choice] = ModelRouter(backends)
+        return RoutedChatModel(router=self.router)
+
+    def router_stats(self):
+        """Statistik saben backend (latensi EWMA, error, menang) kanggo heartbeat/dashboard."""
+        router = self.router or _ROUTERS.get(self.model_choice)
+        return router.snapshot() if router is not None else {}
+
+    def _compute_fingerprint(self):
+        """Hash saka prompt + daftar tools, kanggo ndeteksi kapan executor kudu dibangun maneh."""
+        h = hashlib.sha1(self.system_prompt.encode("utf-8"))
+        for t in self.tools:
+            h.update(f"\0{t.name}\0{t.description}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _build_executor(self):
+        llm = self._get_llm()
+        
+        # memory_summary: ringkasan turn lawas saka ConversationMemory (kosong nek durung ana)
+        prompt = ChatPromptTemplate.from_messages([
+        ("system", self.system_prompt.replace("{", "{{").replace("}", "}}") + "\n{memory_summary}"),
         MessagesPlaceholder(variable_name="chat_history"),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
+        ]).partial(memory_summary="")
         
-        agent = create_tool_calling_agent(llm, bot_tools, prompt)
-        return AgentExecutor(agent=agent, tools=bot_tools, verbose=True, handle_parsing_errors=True)
\ No newline at end of file
+        agent = create_tool_calling_agent(llm, self.tools, prompt)
+        # verbose=False: trace dikirim liwat metrics.py (sampling, async), ora dicithak nang stdout
+        return AgentExecutor(agent=agent, tools=self.tools, verbose=False, handle_parsing_errors=True)
+
+    def get_executor(self, db_manager_instance): 
+        """Njupuk executor saka registry; mung dibangun nek durung onok utawa prompt/tools berubah."""
+        if tools.GLOBAL_DB_INSTANCE is not db_manager_instance:
+            # Siji DatabaseManager saben proses: sing pungkasan disuntik sing dienggo tools
+            set_global_db(db_manager_instance)
+
+        entry = _EXECUTOR_REGISTRY.get(self.model_choice)
+        if entry and entry[0] == self._fingerprint:
+            return entry[1]
+
+        with _REGISTRY_LOCK:
+            # Cek maneh sakwise entuk lock, ben ora dibangun kaping pindho
+            entry = _EXECUTOR_REGISTRY.get(self.model_choice)
+            if entry and entry[0] == self._fingerprint:
+                return entry[1]
+            executor = self._build_executor()
+            _EXECUTOR_REGISTRY[self.model_choice] = (self._fingerprint, executor)
+            return executor
+
+    def warmup(self, db_manager_instance):
+        """Mbangun executor pas startup supaya pesen pertama ora kena biaya inisialisasi."""
+        return self.get_executor(db_manager_instance)
+
+    def reload(self, db_manager_instance=None, system_prompt=None, tools=None):
+        """Hot reload: ganti prompt/tools lan bangun ulang executor sing kena.
+
+        Executor lawas tetep urip kanggo request sing lagi mlaku; request anyar
+        langsung nganggo sing anyar.
+        """
+        if system_prompt is not None:
+            self.system_prompt = system_prompt
+        if tools is not None:
+            self.tools = list(tools)
+        self._fingerprint = self._compute_fingerprint()
+
+        with _REGISTRY_LOCK:
+            _EXECUTOR_REGISTRY.pop(self.model_choice, None)
+
+        if db_manager_instance is not None:
+            return self.get_executor(db_manager_instance)
+        return None
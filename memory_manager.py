@@ -0,0 +1,141 @@
+import os
+import re
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+# ==========================================
+# ⚙️ KONFIGURASI MEMORI
+# ==========================================
+# Budget token kanggo history sing dikirim menyang LLM (ora kalebu system prompt)
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+# Turn lawas: dhaptar (asil cari_produk lsp.) dicekak dadi semene baris
+STALE_LIST_MAX_LINES = 3
+SUMMARY_HEADER = "Ringkasan obrolan sadurunge (fakta penting):"
+
+# Ukara sing ngemot fakta penting: rega, jumlah, ukuran, nomer order
+FACT_PATTERNS = [
+    re.compile(r"Rp\s?\d[\d.,]*", re.IGNORECASE),
+    re.compile(r"\b\d+\s*(?:pcs|lembar|lbr|meter|mtr|rim|box|eks|eksemplar|buah|biji|set|rangkap)\b", re.IGNORECASE),
+    re.compile(r"\b(?:A[0-6]\+?|B[4-5]|F4)\b"),
+    re.compile(r"\b\d+\s*x\s*\d+\s*(?:cm|m|mm)?\b", re.IGNORECASE),
+    re.compile(r"\bORDER-\d{12}(?:-\d{4})?\b", re.IGNORECASE),
+    re.compile(r"\b(?:total|deal|sepakat|jadi pesan|fix)\b", re.IGNORECASE),
+]
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_LIST_LINE = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s+")
+
+
+def estimate_tokens(text):
+    """Perkiraan jumlah token (kira-kira 4 karakter saben token)."""
+    return len(text or "") // 4 + 1
+
+
+def extract_facts(text, max_chars=160, skip_lists=False):
+    """Njupuk ukara sing ngemot fakta penting (rega, jumlah, spek, nomer order).
+
+    skip_lists: baris dhaptar (asil tool kaya katalog produk) ora dijupuk.
+    """
+    facts = []
+    for line in (text or "").split("\n"):
+        if _LIST_LINE.match(line):
+            if skip_lists:
+                continue
+            line = _LIST_LINE.sub("", line)
+        for sentence in _SENTENCE_SPLIT.split(line):
+            sentence = sentence.strip()
+            if sentence and any(p.search(sentence) for p in FACT_PATTERNS):
+                facts.append(sentence[:max_chars])
+    return facts
+
+
+def strip_stale_lists(text, max_lines=STALE_LIST_MAX_LINES):
+    """Dhaptar dawa nang turn lawas (contone katalog produk) dicekak."""
+    lines = (text or "").split("\n")
+    list_lines = [i for i, line in enumerate(lines) if _LIST_LINE.match(line)]
+    if len(list_lines) <= max_lines:
+        return text
+    drop = set(list_lines[max_lines:])
+    kept = [line for i, line in enumerate(lines) if i not in drop]
+    kept.append(f"(... {len(drop)} baris dhaptar lawas dibuang)")
+    return "\n".join(kept)
+
+
+class ConversationMemory:
+    """History chat kanthi budget token tetep: turn anyar disimpen utuh, turn lawas
+    dilempitake dadi ringkasan fakta (produk, jumlah, rega) sing terus diperbarui.
+
+    Ringkasan disimpen nang SessionStore dadi SystemMessage nang posisi pertama.
+    """
+
+    def __init__(self, store, token_budget=MEMORY_TOKEN_BUDGET, summary_tokens=MEMORY_SUMMARY_TOKENS):
+        self.store = store
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+
+    @staticmethod
+    def _split(messages):
+        if messages and isinstance(messages[0], SystemMessage):
+            return messages[0].content, messages[1:]
+        return "", list(messages)
+
+    def load(self, chat_id):
+        """Mbalekake (summary_text, history) sing wis mlebu budget."""
+        summary, history = self._split(self.store.get(chat_id))
+        return summary, history
+
+    def save_turn(self, chat_id, human_text, ai_text):
+        messages = self.store.get(chat_id) + [HumanMessage(content=human_text), AIMessage(content=ai_text)]
+        self.store.replace(chat_id, self.compact(messages))
+
+    def _build_summary(self, old_summary, facts):
+        lines = [l[2:] for l in old_summary.split("\n")[1:] if l.startswith("- ")] + facts
+        # Buang duplikat, sing anyar menang
+        seen = set()
+        unique = []
+        for line in reversed(lines):
+            key = line.lower()
+            if key not in seen:
+                seen.add(key)
+                unique.append(line)
+        unique.reverse()
+        # Fakta paling lawas dibuang nek ngluwihi budget ringkasan
+        while unique and estimate_tokens("\n".join(unique)) > self.summary_tokens:
+            unique.pop(0)
+        if not unique:
+            return ""
+        return SUMMARY_HEADER + "\n" + "\n".join(f"- {line}" for line in unique)
+
+    def compact(self, messages):
+        """Njaga history tetep nang njero budget token lan watesan jumlah pesen store."""
+        summary, history = self._split(messages)
+        budget = self.token_budget - estimate_tokens(summary)
+        # Sisakke siji slot kanggo ringkasan nang store
+        max_messages = max(2, self.store.max_messages - 1)
+
+        kept = []
+        used = 0
+        for idx in range(len(history) - 1, -1, -1):
+            msg = history[idx]
+            # Turn pungkasan utuh; turn lawas dhaptar-e dicekak
+            content = msg.content if idx >= len(history) - 2 else strip_stale_lists(msg.content)
+            tokens = estimate_tokens(content)
+            if len(kept) >= 2 and (used + tokens > budget or len(kept) >= max_messages):
+                break
+            kept.append(type(msg)(content=content))
+            used += tokens
+        kept.reverse()
+        # Potong nang wates turn: history sing dikirim diwiwiti pesen customer
+        if len(kept) > 2 and not isinstance(kept[0], HumanMessage):
+            kept.pop(0)
+
+        dropped = history[:len(history) - len(kept)]
+        if dropped:
+            facts = []
+            for msg in dropped:
+                if isinstance(msg, HumanMessage):
+                    facts.extend(f"Customer: {fact}" for fact in extract_facts(msg.content))
+                else:
+                    facts.extend(f"Bot: {fact}" for fact in extract_facts(msg.content, skip_lists=True))
+            summary = self._build_summary(summary, facts)
+
+        return ([SystemMessage(content=summary)] if summary else []) + kept
@@ -0,0 +1,284 @@
+"""Metrik entheng kanggo jalur pesen bot: span wektu saben tahap, histogram
+(p50/p95/p99), counter, lan ekspor trace sing di-sampling menyang file JSONL
+nang thread background (ngganteni log verbose nang stdout).
+
+    with span("rag.embed"):
+        ...
+    async with trace("bot.handle_message", chat_id=chat_id):
+        ...
+"""
+import os
+import json
+import time
+import queue
+import random
+import bisect
+import asyncio
+import threading
+import contextvars
+
+# ==========================================
+# ⚙️ KONFIGURASI METRIK
+# ==========================================
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = endpoint mati
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# Bucket eksponensial 0.5ms .. ~100s (detik), saben bucket 25% luwih amba
+BUCKETS = [0.0005 * (1.25 ** i) for i in range(56)]
+
+
+class Histogram:
+    """Histogram bucket tetep: observe() murah, percentile diinterpolasi nang njero bucket."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts else [0] * (len(BUCKETS) + 1)
+        self.count = sum(self.counts)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lower = BUCKETS[idx - 1] if idx > 0 else 0.0
+                upper = BUCKETS[idx] if idx < len(BUCKETS) else max(self.max, lower)
+                value = lower + (upper - lower) * (rank - seen) / c
+                return min(value, self.max) if self.max else value
+            seen += c
+        return self.max
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count) if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "total": self.total,
+            "buckets": self.counts,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        h = cls(snap.get("buckets"))
+        h.total = snap.get("total", 0.0)
+        h.max = snap.get("max", 0.0)
+        return h
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            h = self._histograms.get(name)
+            if h is None:
+                h = self._histograms[name] = Histogram()
+            h.observe(seconds)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def histogram(self, name):
+        return self._histograms.get(name)
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "histograms": {k: h.snapshot() for k, h in self._histograms.items()},
+                "counters": dict(self._counters),
+            }
+
+
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+incr = REGISTRY.incr
+snapshot = REGISTRY.snapshot
+
+
+def merge_snapshots(snapshots):
+    """Nggabungake snapshot saka pirang-pirang worker (kanggo dashboard)."""
+    histograms = {}
+    counters = {}
+    for snap in snapshots:
+        for name, h in snap.get("histograms", {}).items():
+            merged = histograms.get(name)
+            if merged is None:
+                histograms[name] = Histogram.from_snapshot(h)
+            else:
+                merged.merge(Histogram.from_snapshot(h))
+        for name, value in snap.get("counters", {}).items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        "histograms": {k: h.snapshot() for k, h in histograms.items()},
+        "counters": counters,
+    }
+
+
+# ==========================================
+# 🧵 TRACE (Sampling + Ekspor Async)
+# ==========================================
+class TraceExporter:
+    """Nulis trace menyang file JSONL nang thread background; trace dibuang nek antrian kebak."""
+
+    def __init__(self, path=TRACE_FILE, maxsize=1000):
+        self.path = path
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self.dropped = 0
+
+    def export(self, record):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="spectrum-trace", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _worker(self):
+        while True:
+            record = self._queue.get()
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    # Kumpulno sing isih antri ben ora buka-tutup file saben trace
+                    while True:
+                        try:
+                            record = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                print(f"❌ ERROR Trace Export: {e}")
+
+
+EXPORTER = TraceExporter()
+_current_trace = contextvars.ContextVar("spectrum_trace", default=None)
+
+
+def record_span(name, start, duration, error=None, **attrs):
+    """Nyathet siji span: menyang histogram, lan menyang trace aktif (nek kena sampling)."""
+    observe(name, duration)
+    if error is not None:
+        incr(f"{name}.errors")
+    spans = _current_trace.get()
+    if spans is not None:
+        spans.append({"name": name, "start": start, "duration": duration, "error": error, **attrs})
+
+
+class span:
+    """Ngukur wektu siji tahap. Bisa dienggo `with` utawa `async with`."""
+
+    __slots__ = ("name", "attrs", "_t0")
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = None
+        if exc_type is not None and exc_type is not asyncio.CancelledError:
+            error = exc_type.__name__
+        record_span(self.name, self._t0, time.perf_counter() - self._t0, error, **self.attrs)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class trace(span):
+    """Span root kanggo siji pesen. Nek kena sampling, kabeh span anak diekspor bareng."""
+
+    __slots__ = ("_token", "_spans")
+
+    def __enter__(self):
+        self._spans = [] if random.random() < TRACE_SAMPLE_RATE else None
+        self._token = _current_trace.set(self._spans)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._t0
+        observe(self.name, duration)
+        if exc_type is not None and exc_type is not asyncio.CancelledError:
+            incr(f"{self.name}.errors")
+        _current_trace.reset(self._token)
+        if self._spans is not None:
+            EXPORTER.export({
+                "trace": self.name,
+                "at": time.time(),
+                "duration": duration,
+                "error": exc_type.__name__ if exc_type else None,
+                **self.attrs,
+                "spans": [dict(s, start=s["start"] - self._t0) for s in self._spans],
+            })
+        return False
+
+
+# ==========================================
+# 🌐 ENDPOINT METRIK LOKAL
+# ==========================================
+async def _handle_metrics(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 5)
+            if line in (b"\r\n", b"\n", b""):
+                break
+        path = request_line.decode("latin-1").split(" ")[1] if request_line else ""
+        if path.split("?")[0] == "/metrics":
+            body, status = json.dumps(snapshot()).encode("utf-8"), "200 OK"
+        else:
+            body, status = b"", "404 Not Found"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError, IndexError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """Endpoint GET /metrics (JSON). Ora dijalanake nek port 0."""
+    if not port:
+        return None
+    server = await asyncio.start_server(_handle_metrics, host, port)
+    print(f"📈 Metrics endpoint: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,390 @@
+import os
+import json
+import time
+import random
+import asyncio
+from typing import Any, Dict, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from metrics import observe, incr
+
+# ==========================================
+# ⚙️ KONFIGURASI ROUTER
+# ==========================================
+# Wates wektu total saben panggilan model (detik); nek kliwat kabeh backend dibatalake
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "25"))
+# Hedge: nek backend pertama durung njawab sakwise wektu iki, backend kapindho dicoba bareng.
+# 0 = otomatis saka latensi backend (EWMA + 2x deviasi), kaya RTO TCP
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+LLM_HEDGE_MIN = float(os.getenv("LLM_HEDGE_MIN", "1.5"))
+LLM_HEDGE_DEFAULT = float(os.getenv("LLM_HEDGE_DEFAULT", "4"))
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+# Backend sing gagal kaping N berturut-turut diistirahatake sawetara detik
+LLM_MAX_ERRORS = int(os.getenv("LLM_MAX_ERRORS", "3"))
+LLM_COOLDOWN = float(os.getenv("LLM_COOLDOWN", "30"))
+# Sithik traffic dikirim menyang backend nomer loro ben estimasi latensine tetep anyar
+LLM_EXPLORE_RATE = float(os.getenv("LLM_EXPLORE_RATE", "0.05"))
+
+# Backend diceluk tanpa callback: mung RoutedChatModel sing ngetokake event
+# (astream_events / metrics), ben token lan llm.call ora kecathet kaping pindho.
+BACKEND_CONFIG = {"callbacks": []}
+
+
+class BackendStats:
+    """Statistik urip saben backend: EWMA latensi, deviasi, lan tingkat error."""
+
+    def __init__(self, name, alpha=LLM_EWMA_ALPHA):
+        self.name = name
+        self.alpha = alpha
+        self.latency = None
+        self.deviation = 0.0
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    def _update_latency(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+            self.deviation = seconds / 2
+        else:
+            self.deviation += self.alpha * (abs(seconds - self.latency) - self.deviation)
+            self.latency += self.alpha * (seconds - self.latency)
+
+    def record_success(self, seconds):
+        self.calls += 1
+        self.consecutive_errors = 0
+        self.error_rate *= 1 - self.alpha
+        self._update_latency(seconds)
+
+    def record_error(self, seconds=None):
+        self.calls += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.error_rate += self.alpha * (1 - self.error_rate)
+        if seconds is not None:
+            self._update_latency(seconds)
+        if self.consecutive_errors >= LLM_MAX_ERRORS:
+            self.cooldown_until = time.monotonic() + LLM_COOLDOWN
+
+    def record_abandoned(self, seconds):
+        """Backend sing kalah balapan: mung dingerteni latensine >= seconds."""
+        if self.latency is None or seconds > self.latency:
+            self._update_latency(seconds)
+
+    def healthy(self, now=None):
+        return (now or time.monotonic()) >= self.cooldown_until
+
+    def score(self):
+        # Backend sing durung tau dicoba oleh skor 0 (dicoba dhisik miturut urutan preferensi)
+        return (self.latency or 0.0) * (1 + 4 * self.error_rate)
+
+    def hedge_delay(self):
+        if LLM_HEDGE_AFTER > 0:
+            return LLM_HEDGE_AFTER
+        if self.latency is None:
+            return LLM_HEDGE_DEFAULT
+        return max(LLM_HEDGE_MIN, self.latency + 2 * self.deviation)
+
+    def snapshot(self):
+        return {
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "deviation": round(self.deviation, 4),
+            "error_rate": round(self.error_rate, 4),
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "healthy": self.healthy(),
+        }
+
+
+class NoBackendAvailable(RuntimeError):
+    """Ora onok backend LLM sing bisa diceluk (kosong utawa kabeh kesaring)."""
+
+
+async def _next_chunk(stream):
+    return await stream.__anext__()
+
+
+class ModelRouter:
+    """Milih backend paling cepet sing sehat kanggo saben panggilan, karo
+    deadline, hedging lan fallback. Urutan `backends` = urutan preferensi.
+    """
+
+    def __init__(self, backends, deadline=LLM_DEADLINE, explore_rate=LLM_EXPLORE_RATE):
+        self.models = dict(backends)
+        self.preference = [name for name, _ in backends]
+        self.stats = {name: BackendStats(name) for name in self.preference}
+        self.deadline = deadline
+        self.explore_rate = explore_rate
+
+    def ranked(self):
+        now = time.monotonic()
+        healthy = [n for n in self.preference if self.stats[n].healthy(now)]
+        benched = [n for n in self.preference if n not in healthy]
+        # sorted() stabil: skor padha -> urutan preferensi
+        healthy.sort(key=lambda n: self.stats[n].score())
+        if len(healthy) > 1 and random.random() < self.explore_rate:
+            healthy[0], healthy[1] = healthy[1], healthy[0]
+        # Backend sing lagi istirahat tetep dadi pilihan pungkasan
+        return healthy + benched
+
+    def _order(self, models):
+        order = [n for n in self.ranked() if n in models]
+        if not order:
+            raise NoBackendAvailable("Ora onok backend LLM sing kasedhiya")
+        return order
+
+    async def _call(self, name, model, messages, kwargs):
+        t0 = time.perf_counter()
+        try:
+            result = await model.ainvoke(messages, config=BACKEND_CONFIG, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.stats[name].record_error(time.perf_counter() - t0)
+            incr(f"llm.backend.{name}.error")
+            raise
+        elapsed = time.perf_counter() - t0
+        self.stats[name].record_success(elapsed)
+        observe(f"llm.backend.{name}", elapsed)
+        return result
+
+    def _abandon(self, pending, started):
+        now = time.perf_counter()
+        for task, name in pending.items():
+            task.cancel()
+            self.stats[name].record_abandoned(now - started[name])
+
+    async def ainvoke(self, messages, models=None, **kwargs):
+        """Mbalekake (jeneng_backend, AIMessage) saka backend sing paling dhisik sukses."""
+        models = models or self.models
+        order = self._order(models)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        hedge_at = loop.time() + self.stats[order[0]].hedge_delay()
+        pending, started = {}, {}
+        last_error = None
+        hedged = False
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = order[next_index]
+            next_index += 1
+            started[name] = time.perf_counter()
+            pending[loop.create_task(self._call(name, models[name], messages, kwargs))] = name
+            return name
+
+        launch()
+        try:
+            while pending or next_index < len(order):
+                if not pending:
+                    # Fallback: backend sadurunge gagal, langsung coba sabanjure
+                    incr("llm.fallback")
+                    launch()
+                now = loop.time()
+                if now >= deadline:
+                    break
+                can_hedge = not hedged and next_index < len(order)
+                timeout = deadline - now
+                if can_hedge:
+                    timeout = max(0.0, min(timeout, hedge_at - now))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge and loop.time() >= hedge_at:
+                        hedged = True
+                        incr("llm.hedge")
+                        launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        self.stats[name].wins += 1
+                        if name != order[0]:
+                            incr("llm.rescued")
+                        return name, task.result()
+                    last_error = task.exception()
+        finally:
+            self._abandon(pending, started)
+            # Enteni task sing dibatalake ben ora bocor ("Task exception was never retrieved")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if last_error is not None and loop.time() < deadline:
+            raise last_error
+        for name in pending.values():
+            self.stats[name].record_error()
+        incr("llm.deadline_exceeded")
+        raise asyncio.TimeoutError(f"LLM ora njawab sajrone {self.deadline:g} detik")
+
+    def invoke(self, messages, models=None, **kwargs):
+        """Versi sync: tanpa hedging (thread ora bisa dibatalake), mung fallback."""
+        models = models or self.models
+        last_error = None
+        for name in self._order(models):
+            t0 = time.perf_counter()
+            try:
+                result = models[name].invoke(messages, config=BACKEND_CONFIG, **kwargs)
+            except Exception as e:
+                self.stats[name].record_error(time.perf_counter() - t0)
+                last_error = e
+                continue
+            self.stats[name].record_success(time.perf_counter() - t0)
+            self.stats[name].wins += 1
+            return name, result
+        raise last_error
+
+    async def astream(self, messages, models=None, **kwargs):
+        """Balapan chunk pertama: backend sing paling dhisik ngetokake chunk menang,
+        liyane dibatalake, terus stream diterusake saka pemenang.
+        """
+        models = models or self.models
+        order = self._order(models)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        hedge_at = loop.time() + self.stats[order[0]].hedge_delay()
+        streams, pending, started = {}, {}, {}
+        last_error = None
+        hedged = False
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = order[next_index]
+            next_index += 1
+            started[name] = time.perf_counter()
+            streams[name] = models[name].astream(messages, config=BACKEND_CONFIG, **kwargs).__aiter__()
+            pending[loop.create_task(_next_chunk(streams[name]))] = name
+
+        winner = first = None
+        launch()
+        try:
+            while winner is None and (pending or next_index < len(order)):
+                if not pending:
+                    incr("llm.fallback")
+                    launch()
+                now = loop.time()
+                if now >= deadline:
+                    break
+                can_hedge = not hedged and next_index < len(order)
+                timeout = deadline - now
+                if can_hedge:
+                    timeout = max(0.0, min(timeout, hedge_at - now))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge and loop.time() >= hedge_at:
+                        hedged = True
+                        incr("llm.hedge")
+                        launch()
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        winner, first = name, task.result()
+                        break
+                    if not isinstance(error, StopAsyncIteration):
+                        self.stats[name].record_error(time.perf_counter() - started[name])
+                        incr(f"llm.backend.{name}.error")
+                        last_error = error
+        finally:
+            self._abandon(pending, started)
+            await asyncio.gather(*pending, return_exceptions=True)
+            for name, stream in streams.items():
+                if name != winner and hasattr(stream, "aclose"):
+                    try:
+                        await stream.aclose()
+                    except Exception:
+                        pass
+
+        if winner is None:
+            if last_error is not None and loop.time() < deadline:
+                raise last_error
+            incr("llm.deadline_exceeded")
+            raise asyncio.TimeoutError(f"LLM ora njawab sajrone {self.deadline:g} detik")
+
+        self.stats[winner].wins += 1
+        if winner != order[0]:
+            incr("llm.rescued")
+        yield winner, first
+        stream = streams[winner]
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                try:
+                    chunk = await asyncio.wait_for(_next_chunk(stream), max(0.0, remaining))
+                except StopAsyncIteration:
+                    break
+                yield winner, chunk
+        except Exception:
+            self.stats[winner].record_error(time.perf_counter() - started[winner])
+            raise
+        elapsed = time.perf_counter() - started[winner]
+        self.stats[winner].record_success(elapsed)
+        observe(f"llm.backend.{winner}", elapsed)
+
+    def snapshot(self):
+        return {name: s.snapshot() for name, s in self.stats.items()}
+
+
+def _to_chunk(message):
+    """AIMessage -> AIMessageChunk (backend tanpa streaming asli mbalekake pesen utuh)."""
+    if isinstance(message, BaseMessageChunk):
+        return message
+    tool_call_chunks = [
+        {"name": tc["name"], "args": json.dumps(tc["args"]), "id": tc.get("id"), "index": i}
+        for i, tc in enumerate(getattr(message, "tool_calls", None) or [])
+    ]
+    return AIMessageChunk(
+        content=message.content,
+        tool_call_chunks=tool_call_chunks,
+        response_metadata=getattr(message, "response_metadata", {}) or {},
+    )
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model LangChain sing nyebar panggilan menyang ModelRouter.
+
+    bind_tools() ngiket tools menyang saben backend, dadi AgentExecutor bisa
+    nganggo model iki kaya model biasa.
+    """
+
+    router: Any
+    bound: Optional[Dict[str, Any]] = None
+
+    @property
+    def _llm_type(self):
+        return "spectrum-routed-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        bound = {name: model.bind_tools(tools, **kwargs) for name, model in self.router.models.items()}
+        return RoutedChatModel(router=self.router, bound=bound)
+
+    def _kwargs(self, stop, kwargs):
+        if stop is not None:
+            kwargs = dict(kwargs, stop=stop)
+        return kwargs
+
+    def _result(self, name, message):
+        message.response_metadata = dict(message.response_metadata or {}, routed_backend=name)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        name, message = self.router.invoke(messages, self.bound, **self._kwargs(stop, kwargs))
+        return self._result(name, message)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        name, message = await self.router.ainvoke(messages, self.bound, **self._kwargs(stop, kwargs))
+        return self._result(name, message)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        async for name, chunk in self.router.astream(messages, self.bound, **self._kwargs(stop, kwargs)):
+            chunk = ChatGenerationChunk(message=_to_chunk(chunk))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,373 @@
+"""Jalur nulis order: nomer order monoton & bebas tabrakan, idempotency key,
+lan antrian write-behind sing awet (spool SQLite lokal) kanggo batch insert
+menyang Supabase.
+
+Disaranake nang Supabase: kolom `nomor_order` nduwe UNIQUE constraint, supaya
+retry (upsert ignore_duplicates) ora nggawe order dobel. Nek constraint-e durung
+onok (Postgres 42P10), writer ngganti dadi lookup-banjur-insert.
+"""
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+from metrics import observe, incr
+
+# ==========================================
+# ⚙️ KONFIGURASI ORDER
+# ==========================================
+ORDER_SPOOL_PATH = os.getenv("ORDER_SPOOL_PATH", "orders_spool.sqlite3")
+# Digit node (0-9), kudu beda saben host sing nulis order
+ORDER_NODE_ID = int(os.getenv("ORDER_NODE_ID", "0")) % 10
+ORDER_NODE_ID_SET = os.getenv("ORDER_NODE_ID") is not None
+ORDER_WRITE_BEHIND = os.getenv("ORDER_WRITE_BEHIND", "1") == "1"
+ORDER_BATCH_SIZE = int(os.getenv("ORDER_BATCH_SIZE", "50"))
+ORDER_FLUSH_INTERVAL = float(os.getenv("ORDER_FLUSH_INTERVAL", "0.2"))
+# Nek spool wis kebak semene, create_order nulis langsung (backpressure)
+ORDER_MAX_PENDING = int(os.getenv("ORDER_MAX_PENDING", "5000"))
+ORDER_SYNC_RETRIES = 3
+# Order sing gagal semene kali (dicoba dhewe-dhewe) dipindah menyang order_dead_letter
+ORDER_MAX_ATTEMPTS = int(os.getenv("ORDER_MAX_ATTEMPTS", "20"))
+RETRY_BACKOFF_MAX = 30.0
+IDEMPOTENCY_TTL = 7 * 24 * 3600
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.executescript(
+        "CREATE TABLE IF NOT EXISTS order_seq (id INTEGER PRIMARY KEY CHECK (id = 1), ts INTEGER NOT NULL, seq INTEGER NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS order_keys (idempotency_key TEXT PRIMARY KEY, nomor_order TEXT NOT NULL, created_at REAL NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS order_spool ("
+        " nomor_order TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0, last_error TEXT);"
+        "CREATE TABLE IF NOT EXISTS order_dead_letter ("
+        " nomor_order TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL, last_error TEXT, failed_at REAL NOT NULL);"
+    )
+    return conn
+
+
+def _error_code(error):
+    return str(getattr(error, "code", "") or "")
+
+
+def _is_permanent(error):
+    """Error data/skema saka Postgres (SQLSTATE kelas 22, 23, 42) ora bakal sukses nek diulang."""
+    return _error_code(error)[:2] in ("22", "23", "42")
+
+
+class OrderIdGenerator:
+    """Nomer order `ORDER-YYMMDDHHMMSS-NSSS` (N = node, SSS = urutan nang detik kuwi).
+
+    Counter disimpen nang SQLite lan dijupuk nganggo BEGIN IMMEDIATE, dadi aman
+    antar proses sak host. Nek jam mundur utawa luwih saka 1000 order sak detik,
+    detik-e "nyilih" saka detik sabanjure supaya tetep monoton.
+    """
+
+    def __init__(self, path=ORDER_SPOOL_PATH, node_id=ORDER_NODE_ID):
+        if not ORDER_NODE_ID_SET and os.getenv("BOT_MODE", "polling") != "polling":
+            # Counter mung aman sak host; host liya kanthi node sing padha bisa nggawe nomer kembar
+            print("⚠️ ORDER_NODE_ID ora diisi (default 0). Nek bot mlaku nang luwih saka siji host, "
+                  "isi ORDER_NODE_ID beda saben host supaya nomer order ora tabrakan.")
+        self.node_id = node_id
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        now_ts = int(time.time())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT ts, seq FROM order_seq WHERE id = 1").fetchone()
+                if row is None or now_ts > row[0]:
+                    ts, seq = now_ts, 0
+                else:
+                    ts, seq = row[0], row[1] + 1
+                    if seq > 999:
+                        ts, seq = ts + 1, 0
+                self._conn.execute(
+                    "INSERT INTO order_seq (id, ts, seq) VALUES (1, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET ts = excluded.ts, seq = excluded.seq",
+                    (ts, seq),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        stamp = datetime.datetime.fromtimestamp(ts).strftime('%y%m%d%H%M%S')
+        return f"ORDER-{stamp}-{self.node_id}{seq:03d}"
+
+
+class OrderWriter:
+    """Nulis order menyang Supabase liwat spool SQLite (write-behind + batch).
+
+    submit() mung mbalekake nomer order sakwise data kasimpen awet nang spool;
+    thread flusher ngirim batch menyang Supabase lan nyoba maneh kanthi backoff.
+    """
+
+    def __init__(self, client, path=ORDER_SPOOL_PATH, batch_size=ORDER_BATCH_SIZE,
+                 flush_interval=ORDER_FLUSH_INTERVAL, max_pending=ORDER_MAX_PENDING,
+                 write_behind=ORDER_WRITE_BEHIND):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.write_behind = write_behind
+        self.id_generator = OrderIdGenerator(path)
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # None = durung dicek; False = orders.nomor_order ora UNIQUE (ora iso upsert on_conflict)
+        self._upsert_supported = None
+        self._check_unique_constraint()
+        # Spool sisa saka proses sadurunge (crash/restart) langsung dikirim
+        if self.pending_count():
+            self._ensure_flusher()
+
+    # --- Idempotency ---
+    def _lookup_key(self, idempotency_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT nomor_order FROM order_keys WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _remember_key(self, idempotency_key, nomor_order):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO order_keys (idempotency_key, nomor_order, created_at) VALUES (?, ?, ?)",
+                (idempotency_key, nomor_order, time.time()),
+            )
+
+    # --- Public API ---
+    def submit(self, data, idempotency_key=None):
+        """Nyimpen order lan mbalekake nomer order (padha nek idempotency_key wis tau dienggo)."""
+        if idempotency_key:
+            existing = self._lookup_key(idempotency_key)
+            if existing:
+                incr("orders.idempotent_replay")
+                return existing
+
+        nomor_order = self.id_generator.next_id()
+        data = dict(data, nomor_order=nomor_order)
+
+        if self.write_behind and self.pending_count() < self.max_pending:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT INTO order_spool (nomor_order, payload, created_at) VALUES (?, ?, ?)",
+                        (nomor_order, json.dumps(data, ensure_ascii=False), time.time()),
+                    )
+                    if idempotency_key:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO order_keys (idempotency_key, nomor_order, created_at) VALUES (?, ?, ?)",
+                            (idempotency_key, nomor_order, time.time()),
+                        )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self._ensure_flusher()
+            self._wake.set()
+            return nomor_order
+
+        # Write-behind mati utawa spool kebak: nulis langsung kanthi retry
+        if self.write_batch([data], retries=ORDER_SYNC_RETRIES):
+            if idempotency_key:
+                self._remember_key(idempotency_key, nomor_order)
+            return nomor_order
+        return None
+
+    def get_pending(self, nomor_order):
+        """Data order sing durung tekan Supabase (spool utawa dead letter), utawa None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM order_spool WHERE nomor_order = ? "
+                "UNION ALL SELECT payload FROM order_dead_letter WHERE nomor_order = ?",
+                (nomor_order, nomor_order),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM order_spool").fetchone()[0]
+
+    def dead_letter_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM order_dead_letter").fetchone()[0]
+
+    def requeue_dead_letters(self):
+        """Mbalekake kabeh order dead letter menyang spool (contone sakwise skema Supabase dibenakake)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO order_spool (nomor_order, payload, created_at) "
+                    "SELECT nomor_order, payload, created_at FROM order_dead_letter"
+                )
+                self._conn.execute("DELETE FROM order_dead_letter")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if cur.rowcount:
+            self._ensure_flusher()
+            self._wake.set()
+        return cur.rowcount
+
+    def _check_unique_constraint(self):
+        """Upsert kosong: Postgres mriksa target ON CONFLICT tanpa nulis baris apa-apa."""
+        try:
+            self.client.table('orders').upsert(
+                [], on_conflict='nomor_order', ignore_duplicates=True
+            ).execute()
+            self._upsert_supported = True
+        except Exception as e:
+            if _error_code(e) == "42P10":
+                self._disable_upsert()
+            else:
+                # Contone jaringan mati: dicek maneh pas nulis pertama
+                print(f"⚠️ Cek constraint orders.nomor_order gagal: {e}")
+
+    def _disable_upsert(self):
+        self._upsert_supported = False
+        print("⚠️ orders.nomor_order ora nduwe UNIQUE constraint: order ditulis nganggo "
+              "lookup-banjur-insert. Tambahna constraint-e supaya retry aman saka order dobel.")
+
+    def _insert_missing(self, rows):
+        """Fallback tanpa UNIQUE constraint: mung insert nomor_order sing durung onok."""
+        numbers = [r["nomor_order"] for r in rows]
+        existing = self.client.table('orders').select('nomor_order').in_('nomor_order', numbers).execute().data
+        known = {r["nomor_order"] for r in existing or []}
+        fresh = [r for r in rows if r["nomor_order"] not in known]
+        if fresh:
+            self.client.table('orders').insert(fresh).execute()
+
+    def _upsert(self, rows):
+        t0 = time.perf_counter()
+        if self._upsert_supported is False:
+            self._insert_missing(rows)
+        else:
+            try:
+                self.client.table('orders').upsert(
+                    rows, on_conflict='nomor_order', ignore_duplicates=True
+                ).execute()
+                self._upsert_supported = True
+            except Exception as e:
+                if _error_code(e) != "42P10":
+                    raise
+                self._disable_upsert()
+                self._insert_missing(rows)
+        observe("orders.batch_write", time.perf_counter() - t0)
+        incr("orders.written", len(rows))
+
+    def write_batch(self, rows, retries=1):
+        """Upsert batch menyang Supabase; nomor_order sing wis ana ora ditulis maneh."""
+        delay = 0.5
+        for attempt in range(retries):
+            try:
+                self._upsert(rows)
+                return True
+            except Exception as e:
+                print(f"❌ ERROR DB (Orders, percobaan {attempt + 1}/{retries}): {e}")
+                incr("orders.write_errors")
+                if attempt + 1 < retries:
+                    time.sleep(delay)
+                    delay = min(delay * 2, RETRY_BACKOFF_MAX)
+        return False
+
+    # --- Flusher ---
+    def _ensure_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name="spectrum-order-writer", daemon=True)
+            self._thread.start()
+
+    def flush_once(self):
+        """Ngirim siji batch saka spool. Mbalekake jumlah order sing kasil ditulis."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT nomor_order, payload, attempts FROM order_spool WHERE next_attempt_at <= ? "
+                "ORDER BY created_at LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+        if not rows:
+            return 0
+
+        if len(rows) > 1 and self.write_batch([json.loads(r[1]) for r in rows]):
+            with self._lock:
+                self._conn.executemany("DELETE FROM order_spool WHERE nomor_order = ?", [(r[0],) for r in rows])
+            observe("orders.batch_size", len(rows))
+            return len(rows)
+
+        # Batch gagal: dicoba siji-siji, ben siji order rusak ora ngalangi order liyane
+        written, failed, deferred = [], [], []
+        for idx, (nomor_order, payload, attempts) in enumerate(rows):
+            try:
+                self._upsert([json.loads(payload)])
+                written.append(nomor_order)
+            except Exception as e:
+                print(f"❌ ERROR DB (Order {nomor_order}, percobaan {attempts + 1}): {e}")
+                incr("orders.write_errors")
+                failed.append((nomor_order, attempts + 1, e))
+                if not written and not _is_permanent(e):
+                    # Order pertama wae wis gagal: Supabase-e sing bermasalah, sisane ditunda
+                    deferred = rows[idx + 1:]
+                    break
+
+        dead = [(n, a, e) for n, a, e in failed if _is_permanent(e) or a >= ORDER_MAX_ATTEMPTS]
+        retry = [(n, a, e) for n, a, e in failed if not (_is_permanent(e) or a >= ORDER_MAX_ATTEMPTS)]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM order_spool WHERE nomor_order = ?", [(n,) for n in written])
+                self._conn.executemany(
+                    "UPDATE order_spool SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE nomor_order = ?",
+                    [(a, now + min(RETRY_BACKOFF_MAX, 2 ** min(a - 1, 5)), str(e)[:500], n) for n, a, e in retry],
+                )
+                self._conn.executemany(
+                    "UPDATE order_spool SET next_attempt_at = ? WHERE nomor_order = ?",
+                    [(now + min(RETRY_BACKOFF_MAX, 2 ** min(r[2], 5)), r[0]) for r in deferred],
+                )
+                for n, a, e in dead:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO order_dead_letter "
+                        "(nomor_order, payload, created_at, attempts, last_error, failed_at) "
+                        "SELECT nomor_order, payload, created_at, ?, ?, ? FROM order_spool WHERE nomor_order = ?",
+                        (a, str(e)[:500], now, n),
+                    )
+                    self._conn.execute("DELETE FROM order_spool WHERE nomor_order = ?", (n,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for n, a, e in dead:
+            incr("orders.dead_lettered")
+            print(f"☠️ Order {n} dipindah menyang order_dead_letter sakwise {a} percobaan: {e}")
+        if written:
+            observe("orders.batch_size", len(written))
+        return len(written)
+
+    def _prune_keys(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM order_keys WHERE created_at < ?", (time.time() - IDEMPOTENCY_TTL,))
+
+    def _flush_loop(self):
+        last_prune = 0.0
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                # Terus ngirim nganti spool kosong (utawa kabeh lagi ngenteni backoff)
+                while self.flush_once() >= self.batch_size:
+                    pass
+                if time.time() - last_prune > 3600:
+                    self._prune_keys()
+                    last_prune = time.time()
+            except Exception as e:
+                print(f"❌ ERROR Order Writer: {e}")
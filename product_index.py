@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import difflib
+import threading
+from cache import TTLCache
+
+# ==========================================
+# ⚙️ KONFIGURASI INDEX PRODUK
+# ==========================================
+PRODUCT_INDEX_TTL = float(os.getenv("PRODUCT_INDEX_TTL", "300"))
+PRODUCT_SEARCH_LIMIT = 10
+MIN_SCORE = 0.5
+
+# Query sing artine "tampilno kabeh"
+ALL_KEYWORDS = {"semua", "produk", "list", "menu"}
+
+# Varian tulisan / basa (Indonesia, Jawa, Inggris) -> bentuk kanonik
+SYNONYMS = {
+    "sticker": "stiker", "setiker": "stiker",
+    "brochure": "brosur", "brosure": "brosur",
+    "flayer": "flyer", "pamflet": "flyer", "pamphlet": "flyer", "selebaran": "flyer",
+    "calendar": "kalender", "kalendar": "kalender",
+    "invitation": "undangan",
+    "card": "kartu", "namecard": "kartunama",
+    "photo": "foto",
+    "stempel": "stempel", "cap": "stempel",
+    # Satuan
+    "lbr": "lembar", "lembaran": "lembar", "sheet": "lembar",
+    "mtr": "meter", "m": "meter", "m2": "meter",
+    "pc": "pcs", "biji": "pcs", "buah": "pcs", "piece": "pcs", "pieces": "pcs",
+    "kotak": "box", "dus": "box",
+}
+
+# Tembung sing ora ngganggo kanggo nggoleki produk
+STOPWORDS = {
+    "berapa", "brp", "harga", "harganya", "rego", "regane", "ada", "onok", "apa", "opo",
+    "saja", "aja", "wae", "sing", "yang", "kak", "min", "mas", "mbak", "mau", "pengen",
+    "kepingin", "dong", "ya", "yo", "per", "untuk", "kanggo", "buat", "gawe", "cetak",
+    "nyetak", "print", "info", "tanya", "takon", "ukuran", "di", "nang", "ning",
+}
+
+# Bobot saben kolom nang skor
+FIELD_WEIGHTS = (("nama_produk", 1.0), ("bahan", 0.5), ("satuan", 0.3))
+
+
+def tokenize(text):
+    """Huruf cilik, pecah dadi token, normalisasi varian tembung & sufiks '-nya'/'-e'."""
+    tokens = []
+    for tok in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if len(tok) > 5 and tok.endswith("nya"):
+            tok = tok[:-3]
+        tokens.append(SYNONYMS.get(tok, tok))
+    return tokens
+
+
+class IndexResult:
+    """Bentuk balikan sing padha karo respon supabase (nduwe atribut .data)."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+class IndexNotReady(RuntimeError):
+    """Katalog durung tau dimuat; sing nyeluk kudu nganggo fallback (query remote)."""
+
+
+class _ProductSnapshot:
+    """Isi index sing ora diowah sakwise dibangun; refresh() ngganti sak-objek.
+    Cache query melu snapshot, dadi asil saka data lawas ora kecampur data anyar.
+    """
+
+    __slots__ = ("products", "postings", "vocab", "query_cache")
+
+    def __init__(self, products, postings, ttl):
+        self.products = products
+        self.postings = postings   # token -> {product_idx: weight}
+        self.vocab = list(postings)
+        self.query_cache = TTLCache(maxsize=512, ttl=ttl)
+
+
+class ProductIndex:
+    """Index katalog produk nang memori. Dimuat sepisan, di-refresh miturut TTL
+    utawa pas invalidate() (contone sakwise add_product).
+
+    Loading mesthi mlaku nang background: nek durung onok data babar pisan,
+    search() ngunggahake IndexNotReady (ora ngalangi thread pool DB).
+    """
+
+    def __init__(self, loader, ttl=PRODUCT_INDEX_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._loaded_at = 0.0
+        # Mundhak saben invalidate(); loading sing diwiwiti sakdurunge ora dianggep seger
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # --- Loading ---
+    def _build(self, products):
+        postings = {}
+        for idx, product in enumerate(products):
+            for field, weight in FIELD_WEIGHTS:
+                for tok in tokenize(str(product.get(field) or "")):
+                    slot = postings.setdefault(tok, {})
+                    slot[idx] = max(slot.get(idx, 0.0), weight)
+        return postings
+
+    def refresh(self):
+        """Muat ulang kabeh produk saka database lan mbangun index anyar.
+
+        Mbalekake False nek onok invalidate() pas loading: snapshot tetep dienggo,
+        nanging isih kadaluwarsa (kudu dimuat maneh).
+        """
+        with self._lock:
+            generation = self._generation
+        products = list(self.loader() or [])
+        snapshot = _ProductSnapshot(products, self._build(products), self.ttl)
+        with self._lock:
+            self._snapshot = snapshot
+            fresh = generation == self._generation
+            if fresh:
+                self._loaded_at = time.monotonic()
+        return fresh
+
+    def invalidate(self):
+        """Tandhani index kadaluwarsa lan langsung muat ulang nang background."""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = 0.0
+            in_use = self._snapshot is not None
+        if in_use:
+            # Produk anyar katon sakwise loading iki rampung, ora ngenteni search sabanjure
+            self._ensure_fresh()
+
+    def _refresh_background(self):
+        try:
+            # Diulang nek onok invalidate() maneh pas loading (paling akeh 3x)
+            for _ in range(3):
+                if self.refresh():
+                    break
+        except Exception as e:
+            print(f"❌ ERROR Product Index Refresh: {e}")
+        finally:
+            self._refreshing = False
+
+    def _ensure_fresh(self):
+        """Mbalekake snapshot saiki; data lawas isih dienggo sak suwene refresh nang background."""
+        with self._lock:
+            snapshot = self._snapshot
+            stale = self._loaded_at == 0.0 or time.monotonic() - self._loaded_at > self.ttl
+            start = stale and not self._refreshing
+            if start:
+                self._refreshing = True
+        if start:
+            threading.Thread(target=self._refresh_background, daemon=True).start()
+        return snapshot
+
+    def warmup(self):
+        """Miwiti loading nang background (contone pas bot start)."""
+        self._ensure_fresh()
+
+    # --- Searching ---
+    @staticmethod
+    def _token_matches(snapshot, tok):
+        """Mbalekake [(vocab_token, similarity)]: exact, prefix, lan fuzzy (typo)."""
+        if tok in snapshot.postings:
+            return [(tok, 1.0)]
+        matches = []
+        if len(tok) >= 3:
+            matches = [(v, 0.8) for v in snapshot.vocab if v.startswith(tok)]
+        if not matches:
+            for v in difflib.get_close_matches(tok, snapshot.vocab, n=3, cutoff=0.75):
+                matches.append((v, 0.8 * difflib.SequenceMatcher(None, tok, v).ratio()))
+        return matches
+
+    def search(self, query, limit=PRODUCT_SEARCH_LIMIT):
+        """Golek produk sing cocok, diurutke saka skor paling dhuwur."""
+        snapshot = self._ensure_fresh()
+        if snapshot is None:
+            raise IndexNotReady("Katalog produk lagi dimuat")
+        normalized = " ".join(tokenize(query))
+        if (query or "").lower().strip() in ALL_KEYWORDS:
+            return snapshot.products[:limit]
+
+        cached = snapshot.query_cache.get(normalized)
+        if cached is not None:
+            return cached
+
+        tokens = [t for t in tokenize(query) if t not in STOPWORDS] or tokenize(query)
+        scores = {}
+        for tok in tokens:
+            best = {}
+            for vocab_tok, sim in self._token_matches(snapshot, tok):
+                for idx, weight in snapshot.postings.get(vocab_tok, {}).items():
+                    best[idx] = max(best.get(idx, 0.0), sim * weight)
+            for idx, score in best.items():
+                scores[idx] = scores.get(idx, 0.0) + score
+
+        needle = (query or "").lower().strip()
+        ranked = []
+        for idx, score in scores.items():
+            score = score / max(len(tokens), 1)
+            # Bonus nek query persis ana nang jeneng produk (kaya ILIKE lawas)
+            if needle and needle in str(snapshot.products[idx].get("nama_produk", "")).lower():
+                score += 1.0
+            if score >= MIN_SCORE:
+                ranked.append((score, idx))
+        ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+
+        result = [snapshot.products[idx] for _, idx in ranked[:limit]]
+        snapshot.query_cache.set(normalized, result)
+        return result
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+# ==========================================
+# ⚙️ KONFIGURASI SESSION
+# ==========================================
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # memory | sqlite
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+SESSION_MAX_CHATS = int(os.getenv("SESSION_MAX_CHATS", "5000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(6 * 3600)))
+
+# Format ringkes: saben pesen disimpen dadi [role, content]
+_CLS_TO_ROLE = {HumanMessage: "h", AIMessage: "a", SystemMessage: "s"}
+_ROLE_TO_CLS = {v: k for k, v in _CLS_TO_ROLE.items()}
+
+
+def to_compact(messages):
+    """Ngowahi list BaseMessage dadi list (role, content)."""
+    return [(_CLS_TO_ROLE.get(type(m), "h"), m.content) for m in messages]
+
+
+def from_compact(rows):
+    """Kebalikane to_compact: list (role, content) dadi list BaseMessage."""
+    return [_ROLE_TO_CLS.get(role, HumanMessage)(content=content) for role, content in rows]
+
+
+class MemorySessionBackend:
+    """Backend nang RAM: LRU sing diwatesi jumlah chat, plus TTL kanggo chat nganggur."""
+
+    def __init__(self, max_chats=SESSION_MAX_CHATS, ttl=SESSION_TTL):
+        self.max_chats = max_chats
+        self.ttl = ttl
+        self._data = OrderedDict()  # chat_id -> (updated_at, rows)
+        self._lock = threading.Lock()
+
+    def load(self, chat_id):
+        with self._lock:
+            entry = self._data.get(chat_id)
+            if entry is None:
+                return []
+            if time.time() - entry[0] > self.ttl:
+                del self._data[chat_id]
+                return []
+            self._data.move_to_end(chat_id)
+            return list(entry[1])
+
+    def save(self, chat_id, rows):
+        with self._lock:
+            self._data[chat_id] = (time.time(), tuple(rows))
+            self._data.move_to_end(chat_id)
+            while len(self._data) > self.max_chats:
+                self._data.popitem(last=False)
+
+    def delete(self, chat_id):
+        with self._lock:
+            self._data.pop(chat_id, None)
+
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            # OrderedDict urut saka sing paling suwe ora dienggo
+            while self._data:
+                chat_id, (updated_at, _) = next(iter(self._data.items()))
+                if updated_at >= cutoff:
+                    break
+                del self._data[chat_id]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteSessionBackend:
+    """Backend SQLite nang disk lokal, supaya history tetep ana sakwise restart."""
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, path=SESSION_DB_PATH, max_chats=SESSION_MAX_CHATS, ttl=SESSION_TTL):
+        self.max_chats = max_chats
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " chat_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, messages TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+    def load(self, chat_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at, messages FROM sessions WHERE chat_id = ?", (str(chat_id),)
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return []
+        return [tuple(r) for r in json.loads(row[1])]
+
+    def save(self, chat_id, rows):
+        payload = json.dumps(list(rows), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (chat_id, updated_at, messages) VALUES (?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET updated_at = excluded.updated_at, messages = excluded.messages",
+                (str(chat_id), time.time(), payload),
+            )
+            self._writes += 1
+            should_prune = self._writes % self.PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    def delete(self, chat_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE chat_id = ?", (str(chat_id),))
+
+    def prune(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM sessions WHERE chat_id NOT IN "
+                "(SELECT chat_id FROM sessions ORDER BY updated_at DESC LIMIT ?)",
+                (self.max_chats,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class SessionStore:
+    """Nyimpen history chat per chat_id kanthi watesan dawa history."""
+
+    def __init__(self, backend, max_messages=SESSION_MAX_MESSAGES):
+        self.backend = backend
+        self.max_messages = max_messages
+
+    def get(self, chat_id):
+        return from_compact(self.backend.load(chat_id))
+
+    def append(self, chat_id, *messages):
+        rows = self.backend.load(chat_id) + to_compact(messages)
+        self.backend.save(chat_id, rows[-self.max_messages:])
+
+    def replace(self, chat_id, messages):
+        self.backend.save(chat_id, to_compact(messages)[-self.max_messages:])
+
+    def reset(self, chat_id):
+        self.backend.delete(chat_id)
+
+    def prune(self):
+        self.backend.prune()
+
+    def __len__(self):
+        return len(self.backend)
+
+
+def create_session_store(backend=None):
+    """Gawe SessionStore miturut konfigurasi SESSION_BACKEND."""
+    backend = backend or SESSION_BACKEND
+    if backend == "sqlite":
+        return SessionStore(SQLiteSessionBackend())
+    if backend == "memory":
+        return SessionStore(MemorySessionBackend())
+    raise ValueError(f"SESSION_BACKEND ora dikenal: {backend}")
@@ -0,0 +1,9 @@
+# ==========================================
+# 🏪 INFO TOKO (STATIS)
+# ==========================================
+# Sumber siji kanggo system prompt agent lan jawaban fast-path.
+SHOP_NAME = "Spectrum Digital Printing"
+SHOP_ADDRESS = "Ruko Manyar Garden Regency 27, Surabaya"
+SHOP_HOURS = "06.30 - 24.00 WIB (Setiap Hari)"
+SHOP_BANK_ACCOUNT = "BCA 1234567890 a.n Spectrum Digital Printing"
+WA_ADMIN = "6281234567890" # <<< GANTI KARO NOMER WA ADMINE
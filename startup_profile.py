@@ -0,0 +1,64 @@
+"""Laporan wektu startup: modul endi sing paling abot pas di-import, lan
+suwene inisialisasi resource abot (Qdrant, model embedding).
+
+Cara nganggo:
+    python startup_profile.py app           # import time modul app
+    python startup_profile.py bot --top 30
+    python startup_profile.py llm_service --resources
+"""
+import sys
+import argparse
+import subprocess
+
+
+def profile_imports(module, top=20):
+    """Nglakoni `python -X importtime -c "import <module>"` nang proses anyar lan
+    mbalekake list (cumulative_us, self_us, package) diurutke saka sing paling suwe.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, rest = line.split(":", 1)
+            self_us, cumulative_us, package = [part.strip() for part in rest.split("|", 2)]
+            rows.append((int(cumulative_us), int(self_us), package))
+        except ValueError:
+            continue
+    if proc.returncode != 0:
+        print(f"⚠️ Import '{module}' gagal:\n{proc.stderr[-2000:]}")
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def profile_resources():
+    """Muat resource abot saka tools.py lan mbalekake wektu inisialisasine (detik)."""
+    import tools
+    tools.warmup_resources(background=False)
+    return dict(tools.STARTUP_TIMINGS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan wektu startup SpectrumBot")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--resources", action="store_true", help="Ukur uga wektu muat Qdrant & embedding")
+    args = parser.parse_args()
+
+    print(f"⏱️ Import time '{args.module}' (top {args.top}, cumulative):")
+    for cumulative_us, self_us, package in profile_imports(args.module, args.top):
+        print(f"  {cumulative_us / 1000:9.1f} ms  (self {self_us / 1000:7.1f} ms)  {package}")
+
+    if args.resources:
+        print("\n⏱️ Inisialisasi resource:")
+        for name, seconds in profile_resources().items():
+            print(f"  {seconds * 1000:9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
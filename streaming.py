@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+from telegram.error import BadRequest, RetryAfter
+from metrics import observe, incr
+
+# ==========================================
+# ⚙️ KONFIGURASI STREAMING
+# ==========================================
+STREAM_REPLIES = os.getenv("BOT_STREAM_REPLIES", "1") == "1"
+# Telegram mbatesi edit pesen (kira-kira 1x/detik saben chat)
+STREAM_EDIT_INTERVAL = float(os.getenv("BOT_STREAM_EDIT_INTERVAL", "1.0"))
+STREAM_MIN_CHARS = int(os.getenv("BOT_STREAM_MIN_CHARS", "40"))
+TELEGRAM_MAX_CHARS = 4096
+
+# Status cekak sing ditampilake pas agent lagi nyeluk tool
+TOOL_STATUS = {
+    "cari_produk": "🔍 Sedhela Kak, lagi ngecek katalog produk...",
+    "konsultasi_cetak": "📚 Sedhela Kak, lagi golek info teknis...",
+    "cek_status_order": "📦 Sedhela Kak, lagi ngecek status order...",
+    "generate_whatsapp_checkout": "🧾 Sedhela Kak, lagi nyiapke link checkout...",
+}
+DEFAULT_STATUS = "⏳ Sedhela ya Kak..."
+
+
+def chunk_text(chunk):
+    """Njupuk teks saka AIMessageChunk (content bisa str utawa list part)."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+class StreamingReply:
+    """Ngirim pesen pertama sak cepete, banjur diedit bertahap (rate-limited)
+    nalika token teka. Pas tool dipanggil, pesen diganti status cekak.
+    """
+
+    def __init__(self, message, started_at=None, edit_interval=STREAM_EDIT_INTERVAL,
+                 min_chars=STREAM_MIN_CHARS):
+        self.message = message
+        self.started_at = started_at or time.perf_counter()
+        self.edit_interval = edit_interval
+        self.min_chars = min_chars
+        self.sent = None
+        self._shown = ""
+        self._buffer = ""
+        self._next_edit_at = 0.0
+
+    @property
+    def has_output(self):
+        return self.sent is not None
+
+    @property
+    def text(self):
+        """Teks jawaban sing wis mlebu (tanpa status tool)."""
+        return self._buffer
+
+    async def _show(self, text, force=False):
+        text = text[:TELEGRAM_MAX_CHARS]
+        if not text.strip() or text == self._shown:
+            return
+        now = time.monotonic()
+        if self.sent is None:
+            self.sent = await self.message.reply_text(text)
+            observe("bot.first_output", time.perf_counter() - self.started_at)
+        else:
+            if not force and now < self._next_edit_at:
+                return
+            try:
+                await self.sent.edit_text(text)
+            except RetryAfter as e:
+                # Kena flood control: edit iki dilewati, edit sabanjure ditunda
+                incr("bot.stream_edit_throttled")
+                self._next_edit_at = now + float(getattr(e, "retry_after", 1))
+                return
+            except BadRequest as e:
+                # "message is not modified" lan sakpanunggalane ora fatal
+                print(f"⚠️ [BOT] Edit stream gagal: {e}")
+                return
+        self._shown = text
+        self._next_edit_at = now + self.edit_interval
+
+    async def on_token(self, text):
+        if not text:
+            return
+        self._buffer += text
+        if len(self._buffer) - len(self._shown) >= self.min_chars:
+            await self._show(self._buffer)
+
+    async def on_tool_start(self, name):
+        # Teks sakdurunge tool call dudu jawaban final, dibuang
+        self._buffer = ""
+        await self._show(TOOL_STATUS.get(name, DEFAULT_STATUS))
+
+    async def _final_edit(self, text):
+        """Edit pungkasan kudu tekan customer: RetryAfter dienteni, nek tetep gagal
+        jawaban dikirim dadi pesen anyar.
+        """
+        if self.sent is None or not text.strip():
+            await self._show(text, force=True)
+            return
+        if text == self._shown:
+            return
+        for attempt in range(2):
+            try:
+                await self.sent.edit_text(text)
+                self._shown = text
+                return
+            except RetryAfter as e:
+                incr("bot.stream_edit_throttled")
+                if attempt == 0:
+                    await asyncio.sleep(float(getattr(e, "retry_after", 1)))
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    self._shown = text
+                    return
+                print(f"⚠️ [BOT] Edit final gagal: {e}")
+                break
+        incr("bot.stream_final_fallback")
+        self.sent = await self.message.reply_text(text)
+        self._shown = text
+
+    async def finish(self, final_text):
+        """Ngirim jawaban final; sing luwih dawa tinimbang wates Telegram dipecah."""
+        final_text = final_text or self._buffer
+        head, tail = final_text[:TELEGRAM_MAX_CHARS], final_text[TELEGRAM_MAX_CHARS:]
+        await self._final_edit(head)
+        while tail:
+            await self.message.reply_text(tail[:TELEGRAM_MAX_CHARS])
+            tail = tail[TELEGRAM_MAX_CHARS:]
+
+
+async def stream_agent_reply(agent, inputs, message, config=None, started_at=None):
+    """Nglakoni agent liwat astream_events lan nge-stream jawabane menyang Telegram.
+    Mbalekake teks jawaban final.
+    """
+    reply = StreamingReply(message, started_at=started_at)
+    final_output = None
+    async for event in agent.astream_events(inputs, version="v2", config=config):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            chunk = event["data"].get("chunk")
+            # Chunk sing isine tool call ora ditampilake
+            if chunk is not None and not getattr(chunk, "tool_call_chunks", None):
+                await reply.on_token(chunk_text(chunk))
+        elif kind == "on_tool_start":
+            await reply.on_tool_start(event["name"])
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                final_output = output.get("output")
+
+    final_output = final_output or reply.text or "Maaf Kak, aku bingung mau jawab apa. Bisa diulangi?"
+    await reply.finish(final_output)
+    return final_output
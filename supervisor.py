@@ -0,0 +1,82 @@
+"""Supervisor proses bot: njalanake worker bot dadi proses kapisah saka
+dashboard Streamlit, lan nguripake maneh worker sing mati.
+
+    python supervisor.py
+
+Jumlah worker: WEBHOOK_WORKERS nek BOT_MODE=webhook-multi, liyane 1
+(Telegram mung ngidini siji poller saben token).
+"""
+import os
+import time
+import signal
+import multiprocessing
+from bot import run_worker
+from bot_status import BOT_STATUS_DIR, HEARTBEAT_INTERVAL, write_status_file
+from webhook_server import BOT_MODE, WEBHOOK_WORKERS, require_webhook_secret
+
+RESTART_BACKOFF_MAX = 60
+
+
+def _spawn(index):
+    proc = multiprocessing.Process(target=run_worker, args=(index,), name=f"spectrum-bot-{index}")
+    proc.start()
+    return proc
+
+
+def supervise(num_workers=None):
+    """Njaga `num_workers` proses bot tetep urip (restart kanthi backoff)."""
+    if num_workers is None:
+        num_workers = WEBHOOK_WORKERS if BOT_MODE == "webhook-multi" else 1
+    if BOT_MODE in ("webhook", "webhook-multi"):
+        # Dicek sakdurunge spawn, ben worker ora di-restart terus-terusan
+        require_webhook_secret()
+    if BOT_MODE == "webhook-multi" and os.getenv("SESSION_BACKEND", "memory") == "memory":
+        print("⚠️ webhook-multi karo SESSION_BACKEND=memory: history chat ora dienggo bareng antar worker.")
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    workers = {i: _spawn(i) for i in range(num_workers)}
+    restarts = {i: 0 for i in range(num_workers)}
+    next_start = {}
+    started_at = time.time()
+    status_path = os.path.join(BOT_STATUS_DIR, "supervisor.json")
+    print(f"🧭 Supervisor: {num_workers} worker bot (mode {BOT_MODE})")
+
+    while not stopping:
+        now = time.time()
+        for i, proc in list(workers.items()):
+            if proc is not None and not proc.is_alive():
+                print(f"⚠️ Worker {i} mati (exit {proc.exitcode}), diuripake maneh...")
+                restarts[i] += 1
+                next_start[i] = now + min(RESTART_BACKOFF_MAX, 2 ** min(restarts[i], 6))
+                workers[i] = None
+            if workers[i] is None and next_start.get(i, 0) <= now:
+                workers[i] = _spawn(i)
+
+        write_status_file(status_path, {
+            "pid": os.getpid(),
+            "mode": BOT_MODE,
+            "started_at": started_at,
+            "heartbeat_at": now,
+            "workers": {str(i): (p.pid if p is not None else None) for i, p in workers.items()},
+            "restarts": restarts,
+        })
+        time.sleep(HEARTBEAT_INTERVAL)
+
+    for proc in workers.values():
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+    for proc in workers.values():
+        if proc is not None:
+            proc.join(timeout=10)
+
+
+if __name__ == "__main__":
+    supervise()
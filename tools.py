@@ -1,48 +1,261 @@
 import os
+import re
+import time
+import asyncio
+import atexit
+import threading
 import urllib.parse
 from langchain_core.tools import tool
-from qdrant_client import QdrantClient
-# Ganti menyang HuggingFace supaya ora kena limit API Google (429 Error)
-from langchain_community.embeddings import HuggingFaceEmbeddings 
+from async_pool import run_db
+from database import AsyncDatabaseManager
+from cache import TTLCache
+from metrics import span, incr
+from shop_info import WA_ADMIN
+from vector_index import LocalVectorIndex
+from embedding_service import BatchingEmbedder
 
 # ==========================================
-# 📡 INISIALISASI KONEKSI
+# 📡 INISIALISASI KONEKSI (Lazy)
 # ==========================================
+# Qdrant lan model embedding ora dimuat pas import maneh. Dashboard sing mung
+# ndelok order ora perlu mbayar biaya muat sentence-transformer. Resource digawe
+# pas pertama dienggo (utawa di-warmup nang background) lan dienggo bareng sak proses.
 
-# Inisialisasi Qdrant Cloud
-qdrant_client = QdrantClient(
-    url=os.getenv("QDRANT_URL"), 
-    api_key=os.getenv("QDRANT_API_KEY")
+_qdrant_client = None
+_embeddings = None
+_qdrant_lock = threading.Lock()
+_embeddings_lock = threading.Lock()
+
+# Wektu inisialisasi saben resource (detik), kanggo laporan startup
+STARTUP_TIMINGS = {}
+
+def get_qdrant_client():
+    """Njupuk QdrantClient (digawe sepisan tok)."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_lock:
+            if _qdrant_client is None:
+                t0 = time.perf_counter()
+                from qdrant_client import QdrantClient
+                _qdrant_client = QdrantClient(
+                    url=os.getenv("QDRANT_URL"), 
+                    api_key=os.getenv("QDRANT_API_KEY")
+                )
+                STARTUP_TIMINGS["qdrant_client"] = time.perf_counter() - t0
+    return _qdrant_client
+
+def get_embeddings():
+    """Njupuk model embedding lokal (dimuat sepisan tok)."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                t0 = time.perf_counter()
+                # Ganti menyang HuggingFace supaya ora kena limit API Google (429 Error)
+                from langchain_community.embeddings import HuggingFaceEmbeddings 
+                # WAJIB: Kudu padha karo sing digunakake nang script upload_to_qdrant.py
+                _embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+                STARTUP_TIMINGS["embeddings"] = time.perf_counter() - t0
+    return _embeddings
+
+def warmup_resources(background=True):
+    """Muat Qdrant client lan model embedding sakdurunge request pertama."""
+    def _warm():
+        try:
+            get_qdrant_client()
+            get_embeddings()
+        except Exception as e:
+            print(f"❌ ERROR Warmup Resource: {e}")
+
+    if not background:
+        _warm()
+        return None
+    t = threading.Thread(target=_warm, name="spectrum-warmup", daemon=True)
+    t.start()
+    return t
+
+def close_resources():
+    """Nutup koneksi Qdrant lan ngeculke model embedding."""
+    global _qdrant_client, _embeddings
+    with _qdrant_lock:
+        if _qdrant_client is not None:
+            try:
+                _qdrant_client.close()
+            except Exception as e:
+                print(f"❌ ERROR Close Qdrant: {e}")
+            _qdrant_client = None
+    with _embeddings_lock:
+        _embeddings = None
+
+atexit.register(close_resources)
+
+def override_resources(qdrant_client=None, embeddings=None):
+    """Ganti resource nganggo implementasi liya (contone stand-in lokal kanggo benchmark)."""
+    global _qdrant_client, _embeddings
+    if qdrant_client is not None:
+        _qdrant_client = qdrant_client
+    if embeddings is not None:
+        _embeddings = embeddings
+    QUERY_VECTOR_CACHE.clear()
+    invalidate_knowledge_cache()
+
+# ==========================================
+# 🗃️ CACHE KONSULTASI (RAG)
+# ==========================================
+KB_COLLECTION = "spectrum_knowledge"
+KB_TOP_K = 3
+
+# Vektor pitakon: mung gumantung teks + model, dadi TTL-e dawa
+QUERY_VECTOR_CACHE = TTLCache(
+    maxsize=int(os.getenv("KB_VECTOR_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("KB_VECTOR_CACHE_TTL", str(24 * 3600))),
+)
+# Hasil top-k: normalized_query -> (vector, [content, ...])
+RETRIEVAL_CACHE = TTLCache(
+    maxsize=int(os.getenv("KB_RESULT_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("KB_RESULT_CACHE_TTL", "900")),
 )
+# Nek > 0, pitakon sing meh padha (cosine >= threshold) nganggo hasil cache sing wis ana
+KB_SEMANTIC_THRESHOLD = float(os.getenv("KB_SEMANTIC_THRESHOLD", "0"))
+KB_VERSION_CHECK_INTERVAL = float(os.getenv("KB_VERSION_CHECK_INTERVAL", "60"))
+# auto: index lokal (knowledge_ingest.py) nek ana, liyane Qdrant | local | qdrant
+KB_BACKEND = os.getenv("KB_BACKEND", "auto")
+
+_kb_version = None
+_kb_checked_at = 0.0
+
+def normalize_query(text):
+    """Huruf cilik, buang tandha waca, spasi dobel dadi siji."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def invalidate_knowledge_cache():
+    """Dipanggil nek isi koleksi spectrum_knowledge berubah."""
+    RETRIEVAL_CACHE.clear()
+
+# Index vektor in-process; cache hasil dibusak otomatis sakwise index dimuat ulang
+LOCAL_KB_INDEX = LocalVectorIndex(on_reload=invalidate_knowledge_cache)
 
-# Inisialisasi Embeddings Lokal (Gratis & Tanpa Limit)
-# WAJIB: Kudu padha karo sing digunakake nang script upload_to_qdrant.py
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+def _use_local_index():
+    if KB_BACKEND == "qdrant":
+        return False
+    return KB_BACKEND == "local" or LOCAL_KB_INDEX.available()
+
+def _check_kb_version():
+    """Nek jumlah point koleksi berubah, cache hasil retrieval dibusak."""
+    global _kb_version
+    info = get_qdrant_client().get_collection(KB_COLLECTION)
+    version = (info.points_count, info.segments_count)
+    if _kb_version is not None and version != _kb_version:
+        invalidate_knowledge_cache()
+    _kb_version = version
+
+async def _maybe_check_kb_version():
+    global _kb_checked_at
+    now = time.monotonic()
+    if now - _kb_checked_at < KB_VERSION_CHECK_INTERVAL:
+        return
+    _kb_checked_at = now
+    try:
+        await run_db(_check_kb_version)
+    except Exception as e:
+        print(f"❌ ERROR KB Version Check: {e}")
+
+def _semantic_lookup(query_vector):
+    """Golek hasil cache saka pitakon sing meh padha (cosine similarity)."""
+    if KB_SEMANTIC_THRESHOLD <= 0:
+        return None
+    cached = RETRIEVAL_CACHE.values()
+    if not cached:
+        return None
+    import numpy as np
+    matrix = np.asarray([vector for vector, _ in cached], dtype=np.float32)
+    q = np.asarray(query_vector, dtype=np.float32)
+    sims = matrix @ q / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(q) + 1e-9)
+    best = int(np.argmax(sims))
+    if sims[best] >= KB_SEMANTIC_THRESHOLD:
+        return cached[best][1]
+    return None
+
+def _embed_documents(texts):
+    return get_embeddings().embed_documents(texts)
+
+# Pitakon konsultasi sing bareng-bareng di-embed dadi siji batch
+EMBEDDER = BatchingEmbedder(_embed_documents)
+
+def _search_knowledge(query_vector, limit=KB_TOP_K):
+    return get_qdrant_client().search(
+        collection_name=KB_COLLECTION,
+        query_vector=query_vector,
+        limit=limit
+    )
+
+async def retrieve_knowledge(query):
+    """Mbalekake list konten paling relevan, nganggo cache vektor lan cache hasil."""
+    key = normalize_query(query)
+    use_local = _use_local_index()
+    if not use_local:
+        await _maybe_check_kb_version()
+
+    cached = RETRIEVAL_CACHE.get(key)
+    if cached is not None:
+        incr("rag.result_cache_hit")
+        return cached[1]
+
+    query_vector = QUERY_VECTOR_CACHE.get(key)
+    if query_vector is None:
+        # Ngowahi pitakon dadi vektor nggunakake HuggingFace (micro-batch nang pool embedding)
+        async with span("rag.embed"):
+            # Key normalisasi mung kanggo cache; sing di-embed teks asli ("A3+" beda karo "a3")
+            query_vector = await EMBEDDER.embed(query.strip() or key)
+        QUERY_VECTOR_CACHE.set(key, query_vector)
+
+    contents = _semantic_lookup(query_vector)
+    if contents is None and use_local:
+        # Index lokal: dot product nang memori, ora perlu round-trip network
+        with span("rag.local_search"):
+            contents = [chunk["content"] for _, chunk in LOCAL_KB_INDEX.search(query_vector, KB_TOP_K)]
+    elif contents is None:
+        # Golek data sing paling mirip nang Qdrant Cloud (nang pool I/O)
+        async with span("rag.qdrant_search"):
+            search_result = await run_db(_search_knowledge, query_vector)
+        contents = [res.payload['content'] for res in search_result]
+    else:
+        incr("rag.semantic_cache_hit")
+
+    RETRIEVAL_CACHE.set(key, (query_vector, contents))
+    return contents
 
 # 1. Variabel Global kanggo Database Relasional (Supabase)
 GLOBAL_DB_INSTANCE = None 
+# Versi async (pool) sing dienggo tools nang jalur bot
+GLOBAL_ASYNC_DB = None
 
 def set_global_db(db_manager):
     """
     Nyuntik instance DatabaseManager saka app.py menyang tools.
     """
-    global GLOBAL_DB_INSTANCE
+    global GLOBAL_DB_INSTANCE, GLOBAL_ASYNC_DB
     GLOBAL_DB_INSTANCE = db_manager
+    GLOBAL_ASYNC_DB = AsyncDatabaseManager(db_manager) if db_manager is not None else None
 
 # ==========================================
 # 🧰 DAFTAR TOOLS (Fungsi Bot)
 # ==========================================
 
 @tool
-def cari_produk(query: str):
+async def cari_produk(query: str):
     """
     PRIORITAS UTAMA. Gunakan jika user tanya HARGA, BAHAN, atau SPESIFIKASI produk.
     Contoh: 'Berapa harga banner?', 'Ada stiker apa saja?'
     """
-    if GLOBAL_DB_INSTANCE is None:
+    if GLOBAL_ASYNC_DB is None:
         return "Error: Database instance belum terhubung."
         
-    res = GLOBAL_DB_INSTANCE.search_products(query)
+    try:
+        res = await GLOBAL_ASYNC_DB.search_products(query)
+    except asyncio.TimeoutError:
+        return "SYSTEM ERROR: Database produk lagi lemot (timeout)."
     
     if res is None:
         return "SYSTEM ERROR: Gagal mengakses database produk."
@@ -57,7 +270,7 @@ def cari_produk(query: str):
     return text
 
 @tool
-def konsultasi_cetak(query: str):
+async def konsultasi_cetak(query: str):
     """
     Gunakan tool ini UNTUK MENJAWAB pertanyaan teknis/konsultasi mengenai:
     - Detail kelebihan/kekurangan bahan (Art Paper, PVC, dll).
@@ -65,23 +278,17 @@ def konsultasi_cetak(query: str):
     - Prosedur kirim file lan estimasi waktu pengerjaan/jilid.
     """
     try:
-        # Ngowahi pitakon dadi vektor nggunakake HuggingFace
-        query_vector = embeddings.embed_query(query)
+        contents = await retrieve_knowledge(query)
 
-        # Golek data sing paling mirip nang Qdrant Cloud
-        search_result = qdrant_client.search(
-            collection_name="spectrum_knowledge",
-            query_vector=query_vector,
-            limit=3 
-        )
-
-        if not search_result:
+        if not contents:
             return "Maaf, informasi teknis mengenai hal tersebut belum tersedia di database konsultasi kami."
 
         # Gabungno konteks hasil pencarian
-        context = "\n".join([res.payload['content'] for res in search_result])
+        context = "\n".join(contents)
         return f"Informasi Teknis (RAG):\n{context}"
 
+    except asyncio.TimeoutError:
+        return "Terjadi kesalahan saat mengakses basis pengetahuan: timeout."
     except Exception as e:
         return f"Terjadi kesalahan saat mengakses basis pengetahuan: {str(e)}"
 
@@ -91,18 +298,21 @@ def generate_whatsapp_checkout(ringkasan_pesanan: str):
     Gunakan HANYA jika customer sudah FIX ingin membeli (setuju harga & spesifikasi).
     Mengahasilkan link chat langsung ke WhatsApp Admin.
     """
-    wa_number = "6281234567890" # Ganti karo nomer WA tokomu
+    wa_number = WA_ADMIN
     pesan = f"Halo Spectrum, saya mau pesan:\n\n{ringkasan_pesanan}\n\nMohon bantu proses ya Kak."
     link = f"https://wa.me/{wa_number}?text={urllib.parse.quote(pesan)}"
     return f"Sipp Kak! Klik link iki kanggo checkout via WhatsApp Admin: {link}"
 
 @tool
-def cek_status_order(nomor_order: str):
+async def cek_status_order(nomor_order: str):
     """Gunakan untuk mengecek status pengerjaan pesanan menggunakan Nomor Order."""
-    if GLOBAL_DB_INSTANCE is None:
+    if GLOBAL_ASYNC_DB is None:
         return "Error: Database instance belum terhubung."
 
-    res = GLOBAL_DB_INSTANCE.check_order_status(nomor_order)
+    try:
+        res = await GLOBAL_ASYNC_DB.check_order_status(nomor_order)
+    except asyncio.TimeoutError:
+        return "SYSTEM ERROR: Database order lagi lemot (timeout). Coba maneh sedhela engkas."
     if not res or not res.data: 
         return f"Maaf Kak, Nomor Order '{nomor_order}' ora ditemokake."
     
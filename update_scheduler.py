@@ -0,0 +1,81 @@
+import os
+import time
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+from metrics import observe, incr
+
+# ==========================================
+# ⚙️ KONFIGURASI SCHEDULER
+# ==========================================
+# Batas global update sing diproses bareng, lan batas antrian per chat
+# (backpressure nek siji chat nge-flood bot).
+MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", "32"))
+MAX_PENDING_PER_CHAT = int(os.getenv("BOT_MAX_PENDING_PER_CHAT", "5"))
+# Semaphore base class PTB ora dienggo kanggo mbatesi (ndelok ChatOrderedUpdateProcessor)
+UNBOUNDED_UPDATES = 2 ** 31 - 1
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Proses update bareng-bareng (concurrent), tapi update saka chat sing padha
+    tetep urut siji-siji supaya history chat ora campur aduk.
+
+    Urutane: antri lock per chat dhisik, BARU njupuk slot global. Dadi chat sing
+    nge-flood ora ngentekke slot global mung kanggo ngenteni giliran.
+
+    process_update() (final nang PTB) njupuk semaphore base class sakdurunge
+    do_process_update(); semaphore iku digawe jembar (ora tau ngalangi) lan
+    wates global sing asli dicekel dhewe sakwise lock per chat.
+    """
+
+    def __init__(self, max_concurrent_updates=None, max_pending_per_chat=None):
+        super().__init__(UNBOUNDED_UPDATES)
+        self.max_concurrent = max_concurrent_updates or MAX_CONCURRENT_UPDATES
+        self.max_pending_per_chat = max_pending_per_chat or MAX_PENDING_PER_CHAT
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._chat_locks = {}
+        self._pending = {}
+        self.dropped_updates = 0
+
+    @staticmethod
+    def _chat_key(update):
+        chat = getattr(update, "effective_chat", None)
+        return chat.id if chat is not None else None
+
+    async def do_process_update(self, update, coroutine):
+        enqueued_at = time.perf_counter()
+        chat_id = self._chat_key(update)
+        if chat_id is None:
+            async with self._slots:
+                observe("bot.queue_wait", time.perf_counter() - enqueued_at)
+                await coroutine
+            return
+
+        pending = self._pending.get(chat_id, 0)
+        if pending >= self.max_pending_per_chat:
+            # Backpressure: antrian chat iki wis kebak, update anyar dibuang
+            coroutine.close()
+            self.dropped_updates += 1
+            incr("bot.updates_dropped")
+            print(f"⚠️ [BOT] Chat {chat_id} kebanjiran pesen ({pending} antri), update dibuang.")
+            return
+
+        self._pending[chat_id] = pending + 1
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        try:
+            async with lock:
+                async with self._slots:
+                    # Suwene update ngenteni giliran chat + slot global
+                    observe("bot.queue_wait", time.perf_counter() - enqueued_at)
+                    await coroutine
+        finally:
+            self._pending[chat_id] -= 1
+            if self._pending[chat_id] == 0:
+                # Ora onok sing ngenteni maneh, lock-e dibusak ben dict ora mbengkak
+                del self._pending[chat_id]
+                self._chat_locks.pop(chat_id, None)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import threading
+
+# ==========================================
+# ⚙️ KONFIGURASI INDEX LOKAL
+# ==========================================
+KB_INDEX_DIR = os.getenv("KB_INDEX_DIR", "kb_index")
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+RELOAD_CHECK_INTERVAL = 5.0
+
+
+def read_index_meta(index_dir=KB_INDEX_DIR):
+    """Maca meta.json index lokal (None nek durung ana). Ora butuh numpy."""
+    try:
+        with open(os.path.join(index_dir, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(index_dir, matrix, chunks, model_name):
+    """Nulis matrix float32 (wis dinormalisasi) + metadata kanthi atomik."""
+    import numpy as np
+
+    os.makedirs(index_dir, exist_ok=True)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    vec_path = os.path.join(index_dir, VECTORS_FILE)
+    meta_path = os.path.join(index_dir, META_FILE)
+
+    matrix.tofile(vec_path + ".tmp")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 and matrix.shape[0] else 0,
+            "count": int(matrix.shape[0]),
+            "updated_at": time.time(),
+            "chunks": chunks,
+        }, f, ensure_ascii=False)
+    # Vektor dhisik, meta pungkasan: pamaca mung ngganti index nek meta berubah
+    os.replace(vec_path + ".tmp", vec_path)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+class LocalVectorIndex:
+    """Index vektor in-process: matrix float32 memory-mapped + metadata chunk.
+    Search = dot product (cosine, vektor wis dinormalisasi) + top-k.
+    Otomatis dimuat ulang nek meta.json berubah (sakwise ingest).
+    """
+
+    def __init__(self, index_dir=KB_INDEX_DIR, on_reload=None):
+        self.index_dir = index_dir
+        self.on_reload = on_reload
+        self._matrix = None
+        self._chunks = []
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _meta_mtime(self):
+        try:
+            return os.stat(os.path.join(self.index_dir, META_FILE)).st_mtime
+        except OSError:
+            return None
+
+    def _load(self, mtime):
+        import numpy as np
+
+        meta = read_index_meta(self.index_dir)
+        if not meta or not meta.get("count"):
+            self._matrix, self._chunks = None, []
+        else:
+            self._matrix = np.memmap(
+                os.path.join(self.index_dir, VECTORS_FILE), dtype=np.float32, mode="r",
+                shape=(meta["count"], meta["dim"]),
+            )
+            self._chunks = meta["chunks"]
+        self._mtime = mtime
+        if self.on_reload is not None:
+            self.on_reload()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < RELOAD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        mtime = self._meta_mtime()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load(mtime)
+
+    def available(self):
+        self._maybe_reload()
+        return self._matrix is not None
+
+    def search(self, query_vector, k=3):
+        """Mbalekake list (score, chunk) paling mirip, diurutke saka skor paling dhuwur."""
+        import numpy as np
+
+        self._maybe_reload()
+        matrix, chunks = self._matrix, self._chunks
+        if matrix is None:
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) + 1e-9)
+        scores = matrix @ q
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), chunks[i]) for i in top]
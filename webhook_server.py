@@ -0,0 +1,255 @@
+"""Server webhook Telegram sing entheng (asyncio murni, tanpa tornado).
+
+Mode sing didhukung (BOT_MODE):
+- polling       : getUpdates kaya biasane.
+- webhook       : siji proses nampa update liwat HTTP.
+- webhook-multi : WEBHOOK_WORKERS proses bind port sing padha (SO_REUSEPORT),
+                  kernel mbagi koneksi. Gunakake SESSION_BACKEND=sqlite supaya
+                  history chat dienggo bareng. Urutan per chat mung dijamin
+                  ing njero siji worker.
+
+TLS biasane dicekel reverse proxy; nek WEBHOOK_CERT/WEBHOOK_KEY diisi, server
+iki dhewe sing nganggo TLS.
+
+Stand-in lokal kanggo ngirim update sintetis & ngukur latensi ack:
+    python webhook_server.py --url http://127.0.0.1:8443/telegram --secret xxx --chats 20 --messages 10
+"""
+import os
+import ssl
+import hmac
+import json
+import time
+import asyncio
+import argparse
+import urllib.parse
+from telegram import Update
+
+# ==========================================
+# ⚙️ KONFIGURASI WEBHOOK
+# ==========================================
+BOT_MODE = os.getenv("BOT_MODE", "polling")  # polling | webhook | webhook-multi
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # URL publik, contone https://bot.spectrum.id
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Wajib kanggo mode webhook: tanpa secret sapa wae bisa POST update palsu
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_CERT = os.getenv("WEBHOOK_CERT")
+WEBHOOK_KEY = os.getenv("WEBHOOK_KEY")
+
+MAX_BODY_BYTES = 1024 * 1024
+KEEPALIVE_TIMEOUT = 75
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class WebhookServer:
+    """Nampa POST saka Telegram, verifikasi secret token, lan nyelehake Update
+    menyang application.update_queue (diproses dening Application sing wis start()).
+    """
+
+    def __init__(self, application, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET,
+                 listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, reuse_port=False):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.listen = listen
+        self.port = port
+        self.reuse_port = reuse_port
+        self._server = None
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self):
+        require_webhook_secret(self.secret_token)
+        ssl_ctx = None
+        if WEBHOOK_CERT and WEBHOOK_KEY:
+            ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ssl_ctx.load_cert_chain(WEBHOOK_CERT, WEBHOOK_KEY)
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.listen, self.port,
+            reuse_port=self.reuse_port or None, ssl=ssl_ctx,
+        )
+        print(f"🌐 Webhook server ngrungokake nang {self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _dispatch(self, method, target, headers, body):
+        path = urllib.parse.urlsplit(target).path
+        if path == "/healthz":
+            return 200
+        if path != self.path:
+            return 404
+        if method != "POST":
+            return 405
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, ""), self.secret_token):
+            self.rejected += 1
+            return 403
+        try:
+            data = json.loads(body)
+            update = Update.de_json(data, self.application.bot)
+        except Exception:
+            return 400
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return 200
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                if length > MAX_BODY_BYTES:
+                    self._write_response(writer, 413, keep_alive=False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status = await self._dispatch(method, target, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer, status, keep_alive=True):
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+
+
+def require_webhook_secret(secret=WEBHOOK_SECRET):
+    """Mode webhook ora oleh mlaku tanpa secret token."""
+    if not secret:
+        raise ValueError(
+            "WEBHOOK_SECRET kudu diisi kanggo mode webhook (1-256 karakter A-Z, a-z, 0-9, _ utawa -). "
+            "Worker webhook-multi kudu nganggo secret sing padha."
+        )
+
+
+async def register_webhook(bot, drop_pending_updates=False):
+    """Ndaftarno URL webhook nang Telegram (cukup siji worker sing nglakoni)."""
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL kudu diisi kanggo mode webhook.")
+    require_webhook_secret(WEBHOOK_SECRET)
+    await bot.set_webhook(
+        url=WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=drop_pending_updates,
+    )
+
+
+# ==========================================
+# 🧪 STAND-IN LOKAL (Update Sintetis)
+# ==========================================
+def synthetic_update(update_id, chat_id, text):
+    """Payload JSON update Telegram minimal kanggo pesen teks private."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": f"Tester{chat_id}"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"Tester{chat_id}"},
+            "text": text,
+        },
+    }
+
+
+async def _post_many(url, secret, payloads):
+    """Ngirim payload siji-siji liwat siji koneksi keep-alive, mbalekake latensi (detik)."""
+    parts = urllib.parse.urlsplit(url)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+        ssl=parts.scheme == "https" or None,
+    )
+    latencies = []
+    try:
+        for payload in payloads:
+            body = json.dumps(payload).encode("utf-8")
+            head = (
+                f"POST {parts.path or '/'} HTTP/1.1\r\nHost: {parts.hostname}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n\r\n"
+            )
+            t0 = time.perf_counter()
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            if b" 200 " not in status_line:
+                print(f"⚠️ Respon ora 200: {status_line!r}")
+    finally:
+        writer.close()
+    return latencies
+
+
+async def run_standin(url, secret, chats=10, messages=5, text="halo kak, harga banner berapa?"):
+    """Simulasi `chats` customer sing saben ngirim `messages` pesen bareng-bareng."""
+    jobs = []
+    update_id = 1
+    for c in range(chats):
+        payloads = []
+        for _ in range(messages):
+            payloads.append(synthetic_update(update_id, 900000 + c, text))
+            update_id += 1
+        jobs.append(_post_many(url, secret, payloads))
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(l for chunk in results for l in chunk)
+    if not latencies:
+        return
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"📨 {len(latencies)} update nang {elapsed:.2f}s ({len(latencies) / elapsed:.1f} upd/s)")
+    print(f"   ack p50={pick(0.50):.1f}ms p95={pick(0.95):.1f}ms p99={pick(0.99):.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in Telegram: POST update sintetis menyang webhook")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--text", default="halo kak, harga banner berapa?")
+    args = parser.parse_args()
+    asyncio.run(run_standin(args.url, args.secret, args.chats, args.messages, args.text))